@@ -1,28 +1,23 @@
-import logging
+from pathlib import Path
 from threading import Thread
+from typing import TYPE_CHECKING
+import logging
 import time
-from typing import cast
-
-from arcparse import arcparser, dict_option, dict_positional, option, subparsers
-import cv2
-import numpy as np
-
-from owl.audio_scale import AudioScale, BarkScale, MelScale
-from owl.converters import (
-    BaseConverter,
-    CircularScanConverter,
-    CurveConverter,
-    HorizontalScanConverter,
-    ScanConverter,
-    ShiftersConverter,
-    VerticalScanConverter,
-)
-from owl.curves import Curve, HilbertCurve, PeanoCurve
-from owl.frequency_curve import FrequencyCurve
+
+from arcparse import arcparser, dict_option, dict_positional, flag, option, subparsers
+
 from owl.logging import init_logging
-from owl.output_stream import AudioOutputStream, FileAudioOutputStream, LiveAudioOutputStream
-from owl.soundgen import Envelope, MultiSineGen
-from owl.types import Frame, Signal
+from owl.registry import AUDIO_SCALES, CLUSTERING_MODES, CONVERTERS, CURVES, SCAN_CONVERTERS, LazyRef
+
+
+# heavy dependencies (OpenCV, NumPy, PortAudio, converters) are imported only once they're needed,
+# so `owl --help` and argument errors stay fast
+if TYPE_CHECKING:
+    from owl.converters import BaseConverter, CurveConverter, QualityLevel
+    from owl.frame_source import FrameSource
+    from owl.output_stream import AudioOutputStream
+    from owl.stats import FrameProfiler, PipelineStats
+    from owl.types import Frame, Signal
 
 
 logger = logging.getLogger("owl")
@@ -30,67 +25,99 @@ logger = logging.getLogger("owl")
 
 class CurveArgs:
     transient_duration: float = 0.01
-    curve_cls: type[Curve] = dict_positional(
-        {
-            "hilbert": HilbertCurve,
-            "peano": PeanoCurve,
-        },
-    )
+    curve_cls: LazyRef = dict_positional(CURVES)
     order: int = 1
 
 
 class ScanArgs:
-    scan_conv_cls: type[ScanConverter] = dict_positional(
-        {
-            "vertical": VerticalScanConverter,
-            "horizontal": HorizontalScanConverter,
-            "circular": CircularScanConverter,
-        },
-    )
+    scan_conv_cls: LazyRef = dict_positional(SCAN_CONVERTERS)
     strip_count: int = option("-c")
     freqs_per_strip: int = option("-n")
     ms_per_frame: int
 
     cue: bool
+    prerender: bool
 
 
 class ShiftersArgs:
     k: int = option(short_only=True)
     intensity_levels: int = 16
     transient_duration: float = 0.01
-    curve_cls: type[Curve] = dict_positional(
-        {
-            "hilbert": HilbertCurve,
-            "peano": PeanoCurve,
-        },
+    clustering: str = dict_option(
+        {mode: mode for mode in CLUSTERING_MODES},
+        default="kmeans",
     )
+    curve_cls: LazyRef = dict_positional(CURVES)
     order: int = 1
 
 
+class SpreadArgs:
+    base_frequency: float = 440
+    order: int = 3
+    transient_duration: float = 0.01
+
+
+class FocusArgs:
+    transient_duration: float = 0.01
+    curve_cls: LazyRef = dict_positional(CURVES)
+    order: int = 3
+    periphery_order: int = 1
+    roi_size: float = 0.25
+    focus_x: float = 0.5
+    focus_y: float = 0.5
+
+
 @arcparser
 class Args:
     input: str = option(
         "-i",
         default=":0",
-        help='input source, use ":<index>" for camera or "<filename>" (default: ":0")',
+        help=(
+            'input source, ":<index>" for camera, "<filename>" for a video, "<directory>" of images, "<file>.npy"'
+            ' frame stack, "stdin:<width>x<height>" for raw grayscale frames or "synthetic:<shapes|noise|gradient>"'
+            ' (default: ":0")'
+        ),
     )
     output: str | None = option("-o")
+    prefetch: int = option(default=8, help="frames decoded ahead for inputs other than cameras (default: 8)")
+    frame_cache: int | None = option(
+        help="read video files from a cache of grayscale frames with this shorter side, decoded on first use",
+    )
 
-    audio_scale_cls: type[AudioScale] = dict_option(
-        {
-            "mel": MelScale,
-            "bark": BarkScale,
-        },
+    audio_scale_cls: LazyRef = dict_option(
+        AUDIO_SCALES,
         name_override="scale",
-        default=MelScale,
+        default=AUDIO_SCALES["mel"],
     )
     lowest_frequency: float = option("-lo", default=100)
     highest_frequency: float = option("-hi", default=800)
     sample_rate: int = option(default=48000)
-    converter: CurveArgs | ScanArgs | ShiftersArgs = subparsers("curve", "scan", "shifters")
 
+    stats_interval: float = option(default=10, help="seconds between stage timing log lines, 0 disables (default: 10)")
+    stats_json: str | None = option(help="write stage timing percentiles into a JSON file at exit")
+    profile_frames: int | None = option(help="cProfile the conversion loop for this many frames")
+    profile_output: str | None = option(help="write the profile into a file instead of logging it")
+
+    trace: str | None = option(help="record the converter's per-frame parameters into a .npz file for owl-resynth")
+
+    render_cache: bool = flag(
+        help="reuse an earlier render of the same input file with the same options, only with -o and file inputs",
+    )
+    render_cache_size: int = option(default=1024, help="render cache size limit in MiB (default: 1024)")
+
+    adaptive: bool = flag(help="lower conversion quality while rendering can't keep up with real time")
+    debug: bool = flag(help="log debug messages, e.g. every scanned strip's volumes (slows down conversion)")
+
+    converter: CurveArgs | ScanArgs | ShiftersArgs | SpreadArgs | FocusArgs = subparsers(
+        "curve", "scan", "shifters", "spread", "focus"
+    )
+
+
+def generate_sound_cue(sample_rate: int) -> "Signal":
+    import numpy as np
+
+    from owl.soundgen import Envelope
 
-def generate_sound_cue(sample_rate: int) -> Signal:
     sound_cue_duration = 0.03
     sound_cue_volume = 0.1
     sound_cue = (
@@ -107,56 +134,138 @@ def generate_sound_cue(sample_rate: int) -> Signal:
     return envelope.apply(sound_cue, sample_rate)
 
 
-def open_capture(input: str) -> cv2.VideoCapture:
-    if input.startswith(":"):
-        return cv2.VideoCapture(int(input[1:]))
-    return cv2.VideoCapture(input)
-
+def instantiate_converter(parsed: Args.shape) -> "BaseConverter":
+    from owl.converters.static.clustering import ClusteringMode
+    from owl.frequency_curve import FrequencyCurve
+    from owl.soundgen import MultiSineGen
 
-def instantiate_converter(parsed: Args.shape) -> BaseConverter:
-    scale = parsed.audio_scale_cls(parsed.lowest_frequency, parsed.highest_frequency)
+    scale = parsed.audio_scale_cls.resolve()(parsed.lowest_frequency, parsed.highest_frequency)
 
     if isinstance(curve_args := parsed.converter, CurveArgs):
-        curve = curve_args.curve_cls(order=curve_args.order)
+        curve = curve_args.curve_cls.resolve()(order=curve_args.order)
         frequencies = scale.get_range(curve.side_length ** 2)
-        return CurveConverter(
+        return CONVERTERS["curve"].resolve()(
             frequency_curve=FrequencyCurve(curve, frequencies),
-            sine_gen=MultiSineGen(frequencies),
+            sine_gen=MultiSineGen(frequencies, sample_rate=parsed.sample_rate),
             transient_duration=curve_args.transient_duration,
             sample_rate=parsed.sample_rate,
         )
     elif isinstance(scan_args := parsed.converter, ScanArgs):
-        return scan_args.scan_conv_cls(
+        return scan_args.scan_conv_cls.resolve()(
             strip_count=scan_args.strip_count,
             frequencies=scale.get_range(scan_args.freqs_per_strip),
             ms_per_frame=scan_args.ms_per_frame,
             sound_cue=generate_sound_cue(parsed.sample_rate) if scan_args.cue else None,
+            prerender=scan_args.prerender,
             sample_rate=parsed.sample_rate,
         )
     elif isinstance(shifters_args := parsed.converter, ShiftersArgs):
-        curve = shifters_args.curve_cls(order=shifters_args.order)
-        return ShiftersConverter(
+        curve = shifters_args.curve_cls.resolve()(order=shifters_args.order)
+        return CONVERTERS["shifters"].resolve()(
             frequency_curve=FrequencyCurve.from_scale(curve, scale),
-            sine_gen=MultiSineGen.blank(count=shifters_args.k),
+            sine_gen=MultiSineGen.blank(count=shifters_args.k, sample_rate=parsed.sample_rate),
             intensity_levels=shifters_args.intensity_levels,
             transient_duration=shifters_args.transient_duration,
+            clustering=ClusteringMode(shifters_args.clustering),
+            sample_rate=parsed.sample_rate,
+        )
+    elif isinstance(spread_args := parsed.converter, SpreadArgs):
+        spread_converter_cls = CONVERTERS["spread"].resolve()
+        frequencies = spread_converter_cls.generate_frequencies(spread_args.base_frequency, spread_args.order)
+        return spread_converter_cls(
+            sine_gen=MultiSineGen(frequencies, sample_rate=parsed.sample_rate),
+            base_frequency=spread_args.base_frequency,
+            order=spread_args.order,
+            transient_duration=spread_args.transient_duration,
             sample_rate=parsed.sample_rate,
         )
+    elif isinstance(focus_args := parsed.converter, FocusArgs):
+        def curve_converter(order: int) -> "CurveConverter":
+            curve = focus_args.curve_cls.resolve()(order=order)
+            frequencies = scale.get_range(curve.side_length ** 2)
+            return CONVERTERS["curve"].resolve()(
+                frequency_curve=FrequencyCurve(curve, frequencies),
+                sine_gen=MultiSineGen(frequencies, sample_rate=parsed.sample_rate),
+                transient_duration=focus_args.transient_duration,
+                sample_rate=parsed.sample_rate,
+            )
+
+        periphery_converter = curve_converter(focus_args.periphery_order)
+        converter = CONVERTERS["focus"].resolve()(
+            detail_converter=curve_converter(focus_args.order),
+            periphery_converter=periphery_converter,
+            periphery_resolution=periphery_converter.frequency_curve.side_length,
+            roi_size=focus_args.roi_size,
+            sample_rate=parsed.sample_rate,
+        )
+        converter.on_cursor_move((focus_args.focus_x, focus_args.focus_y))
+        return converter
     else:
         raise AssertionError("unreachable")
 
 
-def instantiate_output_stream(output_filename: str | None, sample_rate: int) -> AudioOutputStream:
+def degraded_args(parsed: Args.shape, level: "QualityLevel") -> Args.shape:
+    """Arguments of a cheaper converter for an adaptive quality level."""
+    import copy
+
+    degraded = copy.deepcopy(parsed)
+    degraded.sample_rate = parsed.sample_rate // level.sample_rate_divisor
+    reduction = level.detail_reduction
+
+    if isinstance(converter_args := degraded.converter, CurveArgs | ShiftersArgs):
+        converter_args.order = max(converter_args.order - reduction, 1)
+    if isinstance(shifters_args := degraded.converter, ShiftersArgs):
+        shifters_args.k = max(shifters_args.k >> reduction, 1)
+    elif isinstance(scan_args := degraded.converter, ScanArgs):
+        scan_args.freqs_per_strip = max(scan_args.freqs_per_strip >> reduction, 1)
+    elif isinstance(spread_args := degraded.converter, SpreadArgs):
+        spread_args.order = max(spread_args.order - reduction, 1)
+    elif isinstance(focus_args := degraded.converter, FocusArgs):
+        focus_args.order = max(focus_args.order - reduction, 1)
+        focus_args.periphery_order = min(focus_args.periphery_order, focus_args.order)
+    return degraded
+
+
+def instantiate_adaptive_converter(parsed: Args.shape) -> "BaseConverter":
+    from owl.converters import AdaptiveConverter
+
+    return AdaptiveConverter(
+        factory=lambda level: instantiate_converter(degraded_args(parsed, level)),
+        sample_rate=parsed.sample_rate,
+    )
+
+
+def render_params(parsed: Args.shape) -> dict[str, object]:
+    """Everything (besides the input) the rendered audio depends on."""
+    return {
+        "audio_scale": parsed.audio_scale_cls,
+        "lowest_frequency": parsed.lowest_frequency,
+        "highest_frequency": parsed.highest_frequency,
+        "sample_rate": parsed.sample_rate,
+        "frame_cache": parsed.frame_cache,
+        "converter": parsed.converter,
+    }
+
+
+def instantiate_output_stream(output_filename: str | None, sample_rate: int) -> "AudioOutputStream":
+    from owl.output_stream import FileAudioOutputStream, LiveAudioOutputStream
+
     if output_filename is not None:
         return FileAudioOutputStream(filename=output_filename, sample_rate=sample_rate)
     return LiveAudioOutputStream(sample_rate=sample_rate)
 
 
-def main_loop(cap: cv2.VideoCapture, converter: BaseConverter, output_stream: AudioOutputStream) -> None:
+def main_loop(
+    source: "FrameSource",
+    converter: "BaseConverter",
+    output_stream: "AudioOutputStream",
+    stats: "PipelineStats",
+    stats_interval: float = 0,
+    profiler: "FrameProfiler | None" = None,
+) -> None:
     frame: Frame | None = None
     capture_closed = False
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    delta = 1000 / fps
+    delta = 1000 / source.fps
 
     def capture_reader() -> None:
         """
@@ -169,13 +278,14 @@ def main_loop(cap: cv2.VideoCapture, converter: BaseConverter, output_stream: Au
             while 1000 * time.time() - last_frame < delta:
                 time.sleep(0.01)
 
-            success, new_frame = cap.read()
-            if not success:
+            with stats.span("read"):
+                new_frame = source.read()
+            if new_frame is None:
                 logging.error("couldn't read from capture")
                 capture_closed = True
                 break
 
-            frame = cast(Frame, new_frame)
+            frame = new_frame
             last_frame += delta
 
     t = Thread(target=capture_reader, daemon=True)
@@ -192,32 +302,96 @@ def main_loop(cap: cv2.VideoCapture, converter: BaseConverter, output_stream: Au
         while 1000 * time.time() - last_frame < delta:
             time.sleep(0.01)
 
-        converter.update(frame)
-        audio_samples = converter.get_samples(samples_per_frame)
-        output_stream.write(audio_samples)
+        if profiler is not None:
+            profiler.frame_started()
+
+        with stats.span("preprocess"):
+            preprocessed = converter.preprocess(frame)
+        with stats.span("update"):
+            converter.update(preprocessed)
+        with stats.span("get_samples"):
+            audio_samples = converter.get_samples(samples_per_frame)
+        with stats.span("write"):
+            output_stream.write(audio_samples)
         last_frame += delta
 
+        if profiler is not None:
+            profiler.frame_finished()
+        stats.log_periodically(stats_interval)
+
 
 def main() -> int:
-    init_logging()
     args = Args.parse()
+    init_logging(level=logging.DEBUG if args.debug else logging.INFO)
+
+    from owl.frame_source import FrameSourceError, instantiate_frame_source
+    from owl.stats import FrameProfiler, PipelineStats
+
+    cache = None
+    cache_key = ""
+    if args.render_cache and args.adaptive:
+        logger.warning("adaptive renders depend on machine load, not using the render cache")
+    elif args.render_cache and args.output is not None and Path(args.input).is_file():
+        import shutil
+
+        from owl.render_cache import RenderCache
+
+        cache = RenderCache(max_size=args.render_cache_size << 20)
+        cache_key = cache.key(Path(args.input), render_params(args))
+        # a cached render has no trace to record
+        cached = cache.get(cache_key, Path(args.output).suffix) if args.trace is None else None
+        if cached is not None:
+            shutil.copyfile(cached, args.output)
+            return 0
+    elif args.render_cache:
+        logger.warning("render cache only applies to file inputs rendered into a file (-o)")
+
+    # set up tracing before opening the input, unsupported converters are reported without opening anything
+    converter = instantiate_adaptive_converter(args) if args.adaptive else instantiate_converter(args)
+    trace = None
+    if args.trace is not None:
+        from owl.trace import supports_tracing, start_trace
+
+        if not supports_tracing(converter):
+            logger.error(f"error: {type(converter).__name__} doesn't support tracing")
+            converter.close()
+            return 1
+        trace = start_trace(converter)
 
-    cap = open_capture(args.input)
-    if not cap.isOpened():
-        logger.error("error: Failed to open cv2 capture")
+    try:
+        source = instantiate_frame_source(args.input, args.prefetch, args.frame_cache)
+        source.open()
+    except FrameSourceError as e:
+        logger.error(f"error: {e}")
+        converter.close()
         return 1
 
     output_stream = instantiate_output_stream(args.output, args.sample_rate)
-    converter = instantiate_converter(args)
+    stats = PipelineStats()
+    profiler = FrameProfiler(args.profile_frames, args.profile_output) if args.profile_frames else None
 
+    completed = False
     try:
         output_stream.open()
-        main_loop(cap, converter, output_stream)
+        main_loop(source, converter, output_stream, stats, args.stats_interval, profiler)
+        # main_loop also returns when reading fails midway
+        completed = source.reached_end
     except KeyboardInterrupt:
         pass
     finally:
         output_stream.close()
-        cap.release()
-        cv2.destroyAllWindows()
-
+        converter.close()
+        source.close()
+
+        if profiler is not None:
+            profiler.finish()
+        if args.stats_json is not None:
+            stats.dump_json(args.stats_json)
+        if trace is not None and args.trace is not None:
+            trace.save(args.trace)
+
+    # interrupted or truncated renders are incomplete, don't cache them
+    if cache is not None and completed:
+        assert args.output is not None
+        cache.put(cache_key, Path(args.output))
     return 0
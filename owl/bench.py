@@ -0,0 +1,317 @@
+"""
+Benchmarks of converters, sound synthesis and audio sinks
+
+Every case reports its real-time factor, i.e. how many seconds of audio
+(or video) it processes per second of wall time. Anything below 1 can't
+keep up with live playback.
+
+    owl-bench --save baseline.json
+    owl-bench --compare baseline.json --filter curve
+"""
+
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from functools import cache
+from itertools import chain
+from pathlib import Path
+import json
+import logging
+import platform
+import shlex
+import statistics
+import tempfile
+import time
+
+from arcparse import arcparser, option
+import numpy as np
+
+from owl.__main__ import Args, instantiate_converter
+from owl.frame_source import FrameSourceError, OpenCVFrameSource
+from owl.logging import init_logging
+from owl.output_stream import FileAudioOutputStream
+from owl.sample_queue import SampleQueue
+from owl.soundgen import MultiSineBlockGen, MultiSineGen
+from owl.types import Frame
+
+
+logger = logging.getLogger("owl.bench")
+
+SAMPLE_RATE = 48000
+FPS = 30
+SAMPLES_PER_FRAME = SAMPLE_RATE // FPS
+
+# converter arguments as passed to `owl`, `{order}` and `{strips}` are expanded over the matrix below
+CONVERTER_SPECS = (
+    "curve hilbert --order {order}",
+    "shifters -k 4 hilbert --order {order}",
+    "spread --order {order}",
+    "focus hilbert --order {order}",
+    "scan vertical -c {strips} -n 16 --ms-per-frame 500",
+    "scan circular -c {strips} -n 16 --ms-per-frame 500",
+    "scan spiral -c {strips} -n 16 --ms-per-frame 500",
+)
+CURVE_ORDERS = (2, 3, 4)
+STRIP_COUNTS = (16, 64)
+RESOLUTIONS = ((320, 240), (640, 480), (1920, 1080))
+VIDEO_FRAMES = 30
+
+OSCILLATOR_COUNTS = (16, 64, 256)
+
+
+@arcparser
+class BenchArgs:
+    filter: str | None = option("-k", help="only run cases whose name contains this substring")
+    duration: float = option(default=0.5, help="seconds spent measuring each case (default: 0.5)")
+    videos: str = option(default="test_videos/*.mp4", help='videos to convert (default: "test_videos/*.mp4")')
+    save: str | None = option(help="store results as a JSON baseline")
+    compare: str | None = option(help="compare results against a JSON baseline")
+    tolerance: float = option(
+        default=0.2,
+        help="relative real-time factor drop counted as a regression when comparing (default: 0.2)",
+    )
+
+
+class SkipCase(Exception):
+    pass
+
+
+@dataclass
+class BenchCase:
+    name: str
+    setup: Callable[[ExitStack], Callable[[], None]]  # returns the measured step, registers its cleanup
+    seconds_per_step: float  # audio (or video) duration processed by one step
+    work_per_step: float | None = None  # e.g. oscillator-samples, reported as throughput
+    work_unit: str | None = None
+
+
+@dataclass
+class BenchResult:
+    name: str
+    iterations: int
+    mean_ms: float
+    p95_ms: float
+    realtime_factor: float
+    throughput: float | None = None
+    throughput_unit: str | None = None
+
+
+def synthetic_frames(width: int, height: int, count: int = FPS) -> list[Frame]:
+    """Moving gradient with a bright square and noise, deterministic."""
+    rng = np.random.default_rng(0)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    frames = []
+    for i in range(count):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:] = ((xs + 8 * i) % 256).astype(np.uint8)[None, :, None]
+        side = min(width, height) // 4
+        top, left = (i * height // count) % (height - side), (i * width // count) % (width - side)
+        frame[top : top + side, left : left + side] = 255
+        frame ^= rng.integers(0, 16, frame.shape, dtype=np.uint8)
+        frames.append(frame)
+    return frames
+
+
+def video_frames(path: Path, count: int = VIDEO_FRAMES) -> list[Frame]:
+    source = OpenCVFrameSource(target=str(path))
+    try:
+        source.open()
+    except FrameSourceError:
+        return []
+
+    frames = []
+    while len(frames) < count and (frame := source.read()) is not None:
+        frames.append(frame)
+    source.close()
+    return frames
+
+
+def converter_cases(args: BenchArgs.shape) -> Iterator[BenchCase]:
+    inputs: list[tuple[str, Callable[[], list[Frame]]]] = [
+        (f"synthetic-{width}x{height}", lambda width=width, height=height: synthetic_frames(width, height))
+        for width, height in RESOLUTIONS
+    ]
+    for video in sorted(Path().glob(args.videos)):
+        inputs.append((video.name, lambda video=video: video_frames(video)))
+
+    specs = dict.fromkeys(
+        spec.format(order=order, strips=strips)
+        for spec in CONVERTER_SPECS
+        for order in CURVE_ORDERS
+        for strips in STRIP_COUNTS
+    )
+    for input_name, load_input in inputs:
+        # shared by all converters, loaded by the first case which runs
+        load_frames = cache(load_input)
+        for spec in specs:
+
+            def setup(
+                cleanup: ExitStack,
+                spec: str = spec,
+                load_frames: Callable[[], list[Frame]] = load_frames,
+            ) -> Callable[[], None]:
+                frames = load_frames()
+                if not frames:
+                    raise SkipCase("no frames could be decoded")
+
+                converter = instantiate_converter(
+                    Args.parse(["--sample-rate", str(SAMPLE_RATE), *shlex.split(spec)])
+                )
+                cleanup.callback(converter.close)
+                frame_index = 0
+
+                def step() -> None:
+                    nonlocal frame_index
+                    converter.update(frames[frame_index % len(frames)])
+                    converter.get_samples(SAMPLES_PER_FRAME)
+                    frame_index += 1
+
+                return step
+
+            yield BenchCase(name=f"converter/{spec}/{input_name}", setup=setup, seconds_per_step=1 / FPS)
+
+        # cases are run as they're yielded, release the full resolution frames before loading the next input
+        load_frames.cache_clear()
+
+
+def synthesis_cases() -> Iterator[BenchCase]:
+    for count in OSCILLATOR_COUNTS:
+        freqs = np.geomspace(100, 2000, count).tolist()
+
+        def setup_sine_gen(cleanup: ExitStack, freqs: list[float] = freqs) -> Callable[[], None]:
+            gen = MultiSineGen(freqs, sample_rate=SAMPLE_RATE)
+            gen.set_volumes(np.linspace(0, 1, len(freqs)), transient_duration=0.01)
+            return lambda: gen.get_next_samples(SAMPLES_PER_FRAME)
+
+        def setup_block_gen(cleanup: ExitStack, freqs: list[float] = freqs) -> Callable[[], None]:
+            gen = MultiSineBlockGen(
+                freqs, block_count=16, samples_per_block=SAMPLES_PER_FRAME // 16, sample_rate=SAMPLE_RATE
+            )
+            volumes = np.random.default_rng(0).random((16, len(freqs)))
+            return lambda: gen.render(volumes)
+
+        for name, setup in (("multi-sine-gen", setup_sine_gen), ("multi-sine-block-gen", setup_block_gen)):
+            yield BenchCase(
+                name=f"synthesis/{name}/{count}",
+                setup=setup,
+                seconds_per_step=SAMPLES_PER_FRAME / SAMPLE_RATE,
+                work_per_step=count * SAMPLES_PER_FRAME,
+                work_unit="oscillator-samples/s",
+            )
+
+
+def sink_cases() -> Iterator[BenchCase]:
+    signal = np.sin(np.linspace(0, 2 * np.pi * 440, SAMPLES_PER_FRAME)).astype(np.float32)
+
+    def setup_wav(cleanup: ExitStack) -> Callable[[], None]:
+        directory = cleanup.enter_context(tempfile.TemporaryDirectory())
+        stream = FileAudioOutputStream(filename=str(Path(directory) / "bench.wav"), sample_rate=SAMPLE_RATE)
+        stream.open()
+        cleanup.callback(stream.close)
+        return lambda: stream.write(signal)
+
+    def setup_sample_queue(cleanup: ExitStack) -> Callable[[], None]:
+        queue = SampleQueue()
+
+        def step() -> None:
+            queue.push(signal)
+            queue.pop(len(signal))
+
+        return step
+
+    for name, setup in (("wav", setup_wav), ("sample-queue", setup_sample_queue)):
+        yield BenchCase(
+            name=f"sink/{name}",
+            setup=setup,
+            seconds_per_step=SAMPLES_PER_FRAME / SAMPLE_RATE,
+            work_per_step=SAMPLES_PER_FRAME,
+            work_unit="samples/s",
+        )
+
+
+def run_case(case: BenchCase, duration: float, min_iterations: int = 5) -> BenchResult:
+    with ExitStack() as cleanup:
+        step = case.setup(cleanup)
+        step()  # warm up caches and lazily allocated buffers
+
+        timings = []
+        start = time.perf_counter()
+        while len(timings) < min_iterations or time.perf_counter() - start < duration:
+            step_start = time.perf_counter()
+            step()
+            timings.append(time.perf_counter() - step_start)
+
+    mean = statistics.fmean(timings)
+    return BenchResult(
+        name=case.name,
+        iterations=len(timings),
+        mean_ms=1000 * mean,
+        p95_ms=1000 * float(np.percentile(timings, 95)),
+        realtime_factor=case.seconds_per_step / mean,
+        throughput=case.work_per_step / mean if case.work_per_step is not None else None,
+        throughput_unit=case.work_unit,
+    )
+
+
+def format_result(result: BenchResult, baseline: BenchResult | None) -> str:
+    line = f"{result.name:76} {result.mean_ms:9.3f}ms {result.p95_ms:9.3f}ms {result.realtime_factor:9.1f}x"
+    if result.throughput is not None:
+        line += f"  {result.throughput:.3g} {result.throughput_unit}"
+    if baseline is not None:
+        line += f"  ({result.realtime_factor / baseline.realtime_factor - 1:+.0%} vs baseline)"
+    return line
+
+
+def load_baseline(path: str) -> dict[str, BenchResult]:
+    with open(path) as f:
+        data = json.load(f)
+    return {name: BenchResult(**result) for name, result in data["results"].items()}
+
+
+def save_baseline(path: str, results: list[BenchResult]) -> None:
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": {result.name: asdict(result) for result in results},
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main() -> int:
+    init_logging(level=logging.INFO)
+    args = BenchArgs.parse()
+    baseline = load_baseline(args.compare) if args.compare is not None else {}
+
+    print(f"{'case':76} {'mean':>11} {'p95':>11} {'realtime':>10}")
+    results = []
+    regressions = []
+    for case in chain(converter_cases(args), synthesis_cases(), sink_cases()):
+        if args.filter is not None and args.filter not in case.name:
+            continue
+
+        try:
+            result = run_case(case, args.duration)
+        except SkipCase as e:
+            logger.warning(f"skipping {case.name}: {e}")
+            continue
+        results.append(result)
+        print(format_result(result, baseline.get(case.name)), flush=True)
+
+        previous = baseline.get(case.name)
+        if previous is not None and result.realtime_factor < (1 - args.tolerance) * previous.realtime_factor:
+            regressions.append(case.name)
+
+    if args.save is not None:
+        save_baseline(args.save, results)
+        logger.info(f"saved {len(results)} results to {args.save}")
+
+    if regressions:
+        logger.error(f"{len(regressions)} regressions against {args.compare}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
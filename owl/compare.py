@@ -0,0 +1,137 @@
+from pathlib import Path
+from typing import TYPE_CHECKING
+import logging
+import shlex
+import time
+
+from arcparse import arcparser, flag, option, positional
+
+from owl.__main__ import Args, instantiate_converter
+from owl.logging import init_logging
+
+
+if TYPE_CHECKING:
+    from owl.fanout import ConverterFanOut
+    from owl.frame_source import FrameSource
+    from owl.output_stream import AudioOutputStream
+
+
+logger = logging.getLogger("owl.compare")
+
+
+@arcparser
+class CompareArgs:
+    converters: list[str] = positional(
+        help='converter arguments as passed to `owl`, one quoted string per converter (e.g. "curve hilbert --order 2")',
+    )
+    input: str = option(
+        "-i",
+        default=":0",
+        help='input source, same as for `owl` (default: ":0")',
+    )
+    prefetch: int = option(default=8, help="frames decoded ahead for inputs other than cameras (default: 8)")
+    frame_cache: int | None = option(help="same as for `owl`")
+    output: str | None = option(
+        "-o",
+        help="wav file with one channel per converter, plays a mix of all converters if omitted",
+    )
+    split: bool = flag(help="write each converter into its own file, <output stem>.<index>.wav")
+    sample_rate: int = option(default=48000)
+
+
+def instantiate_output_streams(args: CompareArgs.shape, channel_count: int) -> list["AudioOutputStream"]:
+    from owl.output_stream import FileAudioOutputStream, LiveAudioOutputStream
+
+    if args.output is None:
+        return [LiveAudioOutputStream(sample_rate=args.sample_rate)]
+
+    if not args.split:
+        return [FileAudioOutputStream(filename=args.output, channels=channel_count, sample_rate=args.sample_rate)]
+
+    output = Path(args.output)
+    return [
+        FileAudioOutputStream(filename=str(output.with_suffix(f".{i}{output.suffix}")), sample_rate=args.sample_rate)
+        for i in range(channel_count)
+    ]
+
+
+def compare_loop(
+    source: "FrameSource",
+    fan_out: "ConverterFanOut",
+    output_streams: list["AudioOutputStream"],
+    realtime: bool,
+) -> None:
+    """
+    Decode each frame once and feed it to all converters.
+
+    Offline runs (`realtime=False`) process frames as fast as possible.
+    """
+    import numpy as np
+
+    from owl.output_stream import LiveAudioOutputStream
+
+    delta = 1000 / source.fps
+    samples_per_frame = int(delta * fan_out.converters[0].sample_rate / 1000)
+
+    last_frame = time.time() * 1000
+    while True:
+        frame = source.read()
+        if frame is None:
+            break
+
+        fan_out.update(frame)
+        samples = fan_out.get_samples(samples_per_frame)
+        if len(output_streams) == 1 and isinstance(output_streams[0], LiveAudioOutputStream):
+            output_streams[0].write(samples.mean(axis=1))
+        elif len(output_streams) == 1:
+            output_streams[0].write(samples)
+        else:
+            for channel, output_stream in enumerate(output_streams):
+                output_stream.write(np.ascontiguousarray(samples[:, channel]))
+
+        if realtime:
+            last_frame += delta
+            while 1000 * time.time() < last_frame:
+                time.sleep(0.001)
+
+
+def main() -> int:
+    from owl.fanout import ConverterFanOut
+    from owl.frame_source import FrameSourceError, instantiate_frame_source
+
+    init_logging(level=logging.INFO)
+    args = CompareArgs.parse()
+
+    converters = []
+    for converter_args in args.converters:
+        parsed = Args.parse(["--sample-rate", str(args.sample_rate), *shlex.split(converter_args)])
+        converters.append(instantiate_converter(parsed))
+
+    try:
+        source = instantiate_frame_source(args.input, args.prefetch, args.frame_cache)
+        source.open()
+    except FrameSourceError as e:
+        logger.error(f"error: {e}")
+        return 1
+
+    fan_out = ConverterFanOut(converters)
+    output_streams = instantiate_output_streams(args, fan_out.channel_count)
+    realtime = args.output is None or args.input.startswith(":")
+
+    try:
+        for output_stream in output_streams:
+            output_stream.open()
+        compare_loop(source, fan_out, output_streams, realtime=realtime)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for output_stream in output_streams:
+            output_stream.close()
+        fan_out.close()
+        source.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
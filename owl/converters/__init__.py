@@ -1,26 +1,57 @@
-from .converter import BaseConverter
-from .dynamic import (
-    CircularScanConverter,
-    HorizontalScanConverter,
-    ScanConverter,
-    VerticalScanConverter,
-)
-from .static import (
-    CurveConverter,
-    HilbertSpreadConverter,
-    ShiftersConverter,
-    SineConverter,
-)
+from typing import TYPE_CHECKING, Any
+import importlib
 
 
-__all__ = [
-    "BaseConverter",
-    "CircularScanConverter",
-    "SineConverter",
-    "CurveConverter",
-    "ScanConverter",
-    "HilbertSpreadConverter",
-    "ShiftersConverter",
-    "HorizontalScanConverter",
-    "VerticalScanConverter",
-]
+# converters pull in OpenCV and NumPy, import them only once they're accessed
+if TYPE_CHECKING:
+    from .adaptive import AdaptiveConverter, QualityController, QualityLevel
+    from .converter import BaseConverter
+    from .dynamic import (
+        CircularScanConverter,
+        HorizontalScanConverter,
+        RadialScanConverter,
+        SampledScanConverter,
+        SamplingMap,
+        ScanConverter,
+        SpiralScanConverter,
+        VerticalScanConverter,
+    )
+    from .focus import BaseFocusConverter, FocusConverter
+    from .static import (
+        ClusteringMode,
+        CurveConverter,
+        HilbertSpreadConverter,
+        ShiftersConverter,
+        SineConverter,
+    )
+
+
+_modules = {
+    "AdaptiveConverter": ".adaptive",
+    "QualityController": ".adaptive",
+    "QualityLevel": ".adaptive",
+    "BaseConverter": ".converter",
+    "BaseFocusConverter": ".focus",
+    "FocusConverter": ".focus",
+    "CircularScanConverter": ".dynamic",
+    "SineConverter": ".static",
+    "CurveConverter": ".static",
+    "ScanConverter": ".dynamic",
+    "HilbertSpreadConverter": ".static",
+    "ShiftersConverter": ".static",
+    "ClusteringMode": ".static",
+    "HorizontalScanConverter": ".dynamic",
+    "VerticalScanConverter": ".dynamic",
+    "SampledScanConverter": ".dynamic",
+    "SpiralScanConverter": ".dynamic",
+    "RadialScanConverter": ".dynamic",
+    "SamplingMap": ".dynamic",
+}
+
+__all__ = list(_modules)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_modules[name], __name__), name)
@@ -0,0 +1,245 @@
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+import logging
+import time
+
+import numpy as np
+
+from owl.sample_queue import SampleQueue
+from owl.types import Frame, Signal
+
+from .converter import BaseConverter
+from .utils import FrameProduct, PreprocessedFrame
+
+
+logger = logging.getLogger("adaptive_converter")
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """
+    Degradation applied to a converter to make it cheaper
+
+    - `detail_reduction`: steps of lower detail, e.g. curve order or
+      oscillator count, interpreted by the converter factory
+    - `keyframe_interval`: only every n-th frame is analysed
+    - `sample_rate_divisor`: the converter renders at a fraction of the output sample rate
+    """
+
+    name: str
+    detail_reduction: int = 0
+    keyframe_interval: int = 1
+    sample_rate_divisor: int = 1
+
+
+# ordered from the best to the cheapest
+QUALITY_LEVELS = (
+    QualityLevel("full"),
+    QualityLevel("every 2nd frame", keyframe_interval=2),
+    QualityLevel("reduced detail", detail_reduction=1, keyframe_interval=2),
+    QualityLevel("reduced detail, half sample rate", detail_reduction=1, keyframe_interval=2, sample_rate_divisor=2),
+    QualityLevel("minimal", detail_reduction=2, keyframe_interval=3, sample_rate_divisor=2),
+)
+
+
+@dataclass(kw_only=True)
+class QualityController:
+    """
+    Pick a quality level from the time spent rendering each block
+
+    Load is the render time relative to the block's duration (the real-time
+    budget). Quality is stepped down once the mean load of the last `window`
+    blocks exceeds `overload`, and back up once it stays below `headroom`
+    for `recovery_window` blocks. Stepping up which overloads again right
+    away doubles the recovery window, so quality doesn't oscillate.
+    """
+
+    levels: Sequence[QualityLevel] = QUALITY_LEVELS
+    window: int = 30
+    overload: float = 0.7
+    headroom: float = 0.3
+    recovery_window: int = 90
+
+    _level_index: int = field(default=0, init=False)
+    _loads: deque[float] = field(default_factory=deque, init=False)
+    _blocks_since_step_up: int | None = field(default=None, init=False)
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self._level_index]
+
+    def record(self, load: float) -> QualityLevel | None:
+        """Record a block's load, return the new level if it changed."""
+        self._loads.append(load)
+        if len(self._loads) > max(self.window, self.recovery_window):
+            self._loads.popleft()
+        if self._blocks_since_step_up is not None:
+            self._blocks_since_step_up += 1
+
+        recent_load = float(np.mean(list(self._loads)[-self.window :]))
+        if len(self._loads) >= self.window and recent_load > self.overload:
+            if self._level_index == len(self.levels) - 1:
+                return None
+            # the better level couldn't be sustained, wait longer before trying it again
+            if self._blocks_since_step_up is not None and self._blocks_since_step_up <= self.window:
+                self.recovery_window *= 2
+            return self._step(+1, recent_load)
+
+        if (
+            self._level_index > 0
+            and len(self._loads) >= self.recovery_window
+            and float(np.mean(self._loads)) < self.headroom
+        ):
+            self._blocks_since_step_up = 0
+            return self._step(-1, float(np.mean(self._loads)))
+        return None
+
+    def _step(self, direction: int, load: float) -> QualityLevel:
+        previous = self.level
+        self._level_index += direction
+        self._loads.clear()
+        logger.info(
+            "%s quality at %.0f%% load: %s -> %s",
+            "lowering" if direction > 0 else "raising",
+            100 * load,
+            previous.name,
+            self.level.name,
+        )
+        return self.level
+
+
+class Upsampler:
+    """Output of a converter linearly interpolated to an integer multiple of its sample rate"""
+
+    def __init__(self, converter: BaseConverter, factor: int):
+        self.converter = converter
+        self.factor = factor
+        self._last_sample = 0.0
+        self._queue = SampleQueue()
+
+    def get_samples(self, count: int) -> Signal:
+        if self.factor == 1:
+            return self.converter.get_samples(count)
+
+        missing = count - len(self._queue)
+        if missing > 0:
+            source = self.converter.get_samples(-(-missing // self.factor))
+            # interpolate between the previous block's last sample and this block
+            positions = np.arange(1, len(source) * self.factor + 1) / self.factor - 1
+            upsampled = np.interp(positions, np.arange(-1, len(source)), np.concatenate(([self._last_sample], source)))
+            self._last_sample = float(source[-1])
+            self._queue.push(upsampled.astype(np.float32))
+        return self._queue.pop(count)
+
+
+@dataclass(kw_only=True)
+class AdaptiveConverter(BaseConverter):
+    """
+    Degrade quality of a converter while it can't keep up with real time
+
+    The time spent in `update` and `get_samples` is measured against the
+    duration of the samples requested, `controller` decides on the quality
+    level. Levels are applied by rebuilding the converter through `factory`
+    (crossfading from the previous one), skipping frames and upsampling
+    converters rendering at lower sample rates.
+    """
+
+    factory: Callable[[QualityLevel], BaseConverter]
+    controller: QualityController = field(default_factory=QualityController)
+    crossfade_duration: float = 0.05
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+        self._busy_time = 0.0
+        self._frame_index = 0
+        self._forwarded_previews: set[str] = set()
+        self._converter = self._build(self.controller.level)
+        self._fading_converter: Upsampler | None = None
+        self._crossfade_length = max(int(self.crossfade_duration * self.sample_rate), 1)
+        self._crossfade_position = 0
+        self.on("new_listener", self._forward_preview)
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.controller.level
+
+    @property
+    def converter(self) -> BaseConverter:
+        return self._converter.converter
+
+    def required_products(self) -> list[FrameProduct]:
+        return self.converter.required_products()
+
+    def update(self, frame: Frame | PreprocessedFrame) -> None:
+        start = time.perf_counter()
+        if self._frame_index % self.level.keyframe_interval == 0:
+            self.converter.update(frame)
+        self._frame_index += 1
+        self._busy_time += time.perf_counter() - start
+
+    def get_samples(self, count: int) -> Signal:
+        start = time.perf_counter()
+        samples = self._get_crossfaded_samples(count)
+        self._busy_time += time.perf_counter() - start
+
+        load = self._busy_time / (count / self.sample_rate)
+        self._busy_time = 0.0
+        if (level := self.controller.record(load)) is not None:
+            self._switch(level)
+        return samples
+
+    def close(self) -> None:
+        self.converter.close()
+        if self._fading_converter is not None:
+            self._fading_converter.converter.close()
+
+    def _build(self, level: QualityLevel) -> Upsampler:
+        converter = self.factory(level)
+        if converter.sample_rate * level.sample_rate_divisor != self.sample_rate:
+            raise Exception(
+                f"factory built a converter at {converter.sample_rate}Hz for {self.sample_rate}Hz / {level.sample_rate_divisor}"
+            )
+
+        for event in self._forwarded_previews:
+            converter.on(event, lambda frame, event=event, converter=converter: self._emit_preview(converter, event, frame))
+        return Upsampler(converter, level.sample_rate_divisor)
+
+    def _switch(self, level: QualityLevel) -> None:
+        if self._fading_converter is not None:
+            self._fading_converter.converter.close()
+
+        self._fading_converter = self._converter
+        self._crossfade_position = 0
+        self._converter = self._build(level)
+        self._frame_index = 0
+
+    def _get_crossfaded_samples(self, count: int) -> Signal:
+        samples = self._converter.get_samples(count)
+        if self._fading_converter is None:
+            return samples
+
+        fade_count = min(count, self._crossfade_length - self._crossfade_position)
+        ramp = np.arange(self._crossfade_position, self._crossfade_position + fade_count) / self._crossfade_length
+        samples = np.array(samples, dtype=np.float32)
+        samples[:fade_count] = samples[:fade_count] * ramp + self._fading_converter.get_samples(fade_count) * (1 - ramp)
+
+        self._crossfade_position += fade_count
+        if self._crossfade_position >= self._crossfade_length:
+            self._fading_converter.converter.close()
+            self._fading_converter = None
+        return samples
+
+    def _forward_preview(self, event: str, listener: object) -> None:
+        if event not in ("new-input-frame", "new-converter-frame") or event in self._forwarded_previews:
+            return
+
+        self._forwarded_previews.add(event)
+        converter = self.converter
+        converter.on(event, lambda frame: self._emit_preview(converter, event, frame))
+
+    def _emit_preview(self, converter: BaseConverter, event: str, frame: Frame) -> None:
+        # converters being faded out keep publishing, only forward the current one
+        if converter is self.converter:
+            self.emit(event, frame)
@@ -5,18 +5,43 @@ from pyee import EventEmitter
 
 from owl.types import Frame, Signal
 
+from .preview import PreviewChannel
+from .utils import FrameProduct, PreprocessedFrame, Preprocessor
+
 
 @dataclass
 class BaseConverter(EventEmitter, ABC):
     sample_rate: int = field(default=48000, kw_only=True)
+    preview_fps: float = field(default=15.0, kw_only=True)
+    preview_size: int = field(default=480, kw_only=True)
+
+    _preprocessor: Preprocessor = field(default_factory=Preprocessor, init=False, repr=False)
 
     def __post_init__(self) -> None:
         super().__init__()
+        self.preview = PreviewChannel(self, fps=self.preview_fps, max_side=self.preview_size)
 
     @abstractmethod
-    def update(self, frame: Frame) -> None:
+    def update(self, frame: Frame | PreprocessedFrame) -> None:
         ...
 
     @abstractmethod
     def get_samples(self, count: int) -> Signal:
         ...
+
+    def close(self) -> None:
+        """Release resources (e.g. background threads) held by the converter."""
+
+    def required_products(self) -> list[FrameProduct]:
+        """
+        Preprocessing products used by `update`.
+
+        A shared `Preprocessor` computes these once per frame for all its consumers.
+        """
+        return []
+
+    def preprocess(self, frame: Frame | PreprocessedFrame) -> PreprocessedFrame:
+        """Wrap a raw frame with this converter's own preprocessor, pass preprocessed frames through."""
+        if isinstance(frame, PreprocessedFrame):
+            return frame
+        return self._preprocessor.process(frame, self.required_products())
@@ -1,14 +1,35 @@
-from .scan import (
-    CircularScanConverter,
-    HorizontalScanConverter,
-    ScanConverter,
-    VerticalScanConverter,
-)
-
-
-__all__ = [
-    "ScanConverter",
-    "HorizontalScanConverter",
-    "VerticalScanConverter",
-    "CircularScanConverter",
-]
+from typing import TYPE_CHECKING, Any
+import importlib
+
+
+if TYPE_CHECKING:
+    from .sampling import SamplingMap
+    from .scan import (
+        CircularScanConverter,
+        HorizontalScanConverter,
+        RadialScanConverter,
+        SampledScanConverter,
+        ScanConverter,
+        SpiralScanConverter,
+        VerticalScanConverter,
+    )
+
+
+_modules = {
+    "ScanConverter": ".scan",
+    "HorizontalScanConverter": ".scan",
+    "VerticalScanConverter": ".scan",
+    "SampledScanConverter": ".scan",
+    "CircularScanConverter": ".scan",
+    "SpiralScanConverter": ".scan",
+    "RadialScanConverter": ".scan",
+    "SamplingMap": ".sampling",
+}
+
+__all__ = list(_modules)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_modules[name], __name__), name)
@@ -1,12 +1,13 @@
 from abc import abstractmethod
 from dataclasses import dataclass, field
 import logging
+import threading
 
-import numpy as np
-
+from owl.sample_queue import SampleQueue
 from owl.types import Frame, Signal
 
 from ..converter import BaseConverter
+from ..utils import PreprocessedFrame
 
 
 logger = logging.getLogger("dynamic_converter")
@@ -14,13 +15,19 @@ logger = logging.getLogger("dynamic_converter")
 
 @dataclass(kw_only=True)
 class DynamicConverter(BaseConverter):
-    """Generates multiple different tones per frame"""
+    """Generates multiple different tones per frame
+
+    With `prerender` enabled, frames are converted on a background thread
+    whenever the queued audio drops below `3 * ms_between_new_frames`, so
+    `update` and `get_samples` only hand over frames and copy samples.
+    """
 
     ms_per_frame: int  # actual ms per frame will be more if sound cue provided
     sound_cue: Signal | None = None
     ms_between_new_frames: float = 1000 / 30  # 30 FPS is a reasonable assumption
+    prerender: bool = False
 
-    _audio_samples_queue: list[float] = field(default_factory=list, init=False)
+    _audio_samples_queue: SampleQueue = field(default_factory=SampleQueue, init=False)
 
     def __post_init__(self) -> None:
         super().__post_init__()
@@ -31,37 +38,81 @@ class DynamicConverter(BaseConverter):
             else 0
         )
 
+        self._latest_frame: Frame | PreprocessedFrame | None = None
+        self._worker_condition = threading.Condition()
+        # held while converting a frame, changes to the rendering state have to take it as well
+        self._render_lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._closed = False
+
     @abstractmethod
-    def convert_frame(self, frame: Frame) -> Signal:
+    def convert_frame(self, frame: Frame | PreprocessedFrame) -> Signal:
         ...
 
-    def update(self, frame: Frame) -> None:
+    def update(self, frame: Frame | PreprocessedFrame) -> None:
+        if self.prerender:
+            # products of a shared preprocessor live in buffers overwritten two frames later, which the worker
+            # may still be reading then
+            if isinstance(frame, PreprocessedFrame):
+                frame = frame.detached(self.required_products())
+            with self._worker_condition:
+                self._latest_frame = frame
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._prerender_loop, daemon=True)
+                    self._worker.start()
+                self._worker_condition.notify()
+            return
+
         # do nothing if we can afford to wait for the next frame
+        if not self._needs_samples():
+            return
+
+        self._render(frame)
+
+    def get_samples(self, count: int) -> Signal:
+        if len(self._audio_samples_queue) < count:
+            logger.warning("underflow by %d samples", count - len(self._audio_samples_queue))
+        signal = self._audio_samples_queue.pop(count)
+
+        if self.prerender:
+            with self._worker_condition:
+                self._worker_condition.notify()
+        return signal
+
+    def close(self) -> None:
+        with self._worker_condition:
+            self._closed = True
+            self._worker_condition.notify()
+
+    def _needs_samples(self) -> bool:
         # three video frames should be enough time for new frame to be inserted into deque
-        if (
+        return (
             1000 * len(self._audio_samples_queue) / self.sample_rate
-            > 3 * self.ms_between_new_frames
-        ):
-            return
+            <= 3 * self.ms_between_new_frames
+        )
 
+    def _render(self, frame: Frame | PreprocessedFrame) -> None:
         # queue sound cue
         if self.sound_cue is not None:
             logger.debug("Inserting sound cue")
-            self._audio_samples_queue.extend(self.sound_cue)
+            self._audio_samples_queue.push(self.sound_cue)
 
         queue_ms_left = 1000 * len(self._audio_samples_queue) / self.sample_rate
-        logger.debug(f"converting new video frame with {queue_ms_left:.0f}ms to spare")
-
-        signal = self.convert_frame(frame)
-        self._audio_samples_queue.extend(signal)
-
-    def get_samples(self, count: int) -> Signal:
-        if len(self._audio_samples_queue) < count:
-            logging.warning(f"underflow by {count - len(self._audio_samples_queue)} samples")
-            signal = np.pad(self._audio_samples_queue, count, mode="constant", constant_values=0)
-            self._audio_samples_queue.clear()
-        else:
-            signal = np.array(self._audio_samples_queue[:count])
-            self._audio_samples_queue = self._audio_samples_queue[count:]
-
-        return signal
+        logger.debug("converting new video frame with %.0fms to spare", queue_ms_left)
+
+        with self._render_lock:
+            signal = self.convert_frame(frame)
+        self._audio_samples_queue.push(signal)
+
+    def _prerender_loop(self) -> None:
+        while True:
+            with self._worker_condition:
+                self._worker_condition.wait_for(
+                    lambda: self._closed or (self._latest_frame is not None and self._needs_samples())
+                )
+                if self._closed:
+                    return
+                frame = self._latest_frame
+
+            assert frame is not None
+            self._render(frame)
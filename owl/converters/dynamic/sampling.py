@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+import math
+from typing import Self
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from owl.types import Frame
+
+
+@dataclass
+class SamplingMap:
+    """
+    Fixed sample positions of a scan path, grouped into strips.
+
+    Positions are normalized to the frame, `(0, 0)` being the top-left and
+    `(1, 1)` the bottom-right corner, so a single map serves any input
+    resolution. Each sample averages a square area of `footprint` (again
+    relative to the frame) around its position.
+
+    Pixel-space remap tables are computed once per frame shape, after which
+    sampling all strips of a frame is a single `cv2.remap` gather from the
+    source-resolution frame. Footprints too large to be covered by
+    `max_taps_per_axis` taps (e.g. few strips over a 4K frame) are sampled
+    from an area-downscaled frame instead, so samples stay area averages
+    rather than sparse points.
+    """
+
+    xs: npt.NDArray[np.float64]  # (strip_count, samples_per_strip)
+    ys: npt.NDArray[np.float64]
+    footprint: float
+    max_taps_per_axis: int = 8
+
+    _remap_tables: dict[tuple[int, int], tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        self.xs = np.asarray(self.xs, dtype=np.float64)
+        self.ys = np.asarray(self.ys, dtype=np.float64)
+        if self.xs.ndim != 2 or self.xs.shape != self.ys.shape:
+            raise ValueError("sampling map coordinates must be two equally-shaped 2D arrays")
+
+    @property
+    def strip_count(self) -> int:
+        return self.xs.shape[0]
+
+    @property
+    def samples_per_strip(self) -> int:
+        return self.xs.shape[1]
+
+    def sample(self, frame: Frame) -> npt.NDArray[np.float64]:
+        """
+        Sample a grayscale frame, returning `(strip_count, samples_per_strip)` volumes in `[0, 1]`.
+        """
+        height, width = frame.shape[:2]
+        working_width, working_height = self._working_size(width, height)
+        if (working_width, working_height) != (width, height):
+            frame = cv2.resize(frame, (working_width, working_height), interpolation=cv2.INTER_AREA)
+
+        map_x, map_y = self._get_remap_tables(frame.shape[:2])
+        taps = cv2.remap(frame, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        return taps.mean(axis=1).reshape(self.xs.shape) / 255
+
+    def _working_size(self, width: int, height: int) -> tuple[int, int]:
+        """Frame size at which `max_taps_per_axis` taps two pixels apart cover the footprint."""
+        scale = 2 * self.max_taps_per_axis / (self.footprint * max(width, height))
+        if scale >= 1:
+            return width, height
+        return max(round(width * scale), 1), max(round(height * scale), 1)
+
+    def _get_remap_tables(
+        self, shape: tuple[int, int]
+    ) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]:
+        if (tables := self._remap_tables.get(shape)) is not None:
+            return tables
+
+        height, width = shape
+
+        # bilinear taps already average 2x2 pixels, so space them two pixels apart
+        footprint_px = self.footprint * max(width, height)
+        taps_per_axis = min(max(math.ceil(footprint_px / 2), 1), self.max_taps_per_axis)
+        offsets = ((np.arange(taps_per_axis) + 0.5) / taps_per_axis - 0.5) * self.footprint
+        dx, dy = (o.ravel() for o in np.meshgrid(offsets, offsets))
+
+        # one row per sample, one column per tap
+        map_x = (self.xs.reshape(-1, 1) + dx) * width - 0.5
+        map_y = (self.ys.reshape(-1, 1) + dy) * height - 0.5
+        tables = map_x.astype(np.float32), map_y.astype(np.float32)
+        self._remap_tables[shape] = tables
+        return tables
+
+    @classmethod
+    def from_polar(cls, radii: npt.ArrayLike, angles: npt.ArrayLike, footprint: float) -> Self:
+        """Create a map from polar coordinates around the frame center, radii being relative to the frame."""
+        radii = np.asarray(radii, dtype=np.float64)
+        angles = np.asarray(angles, dtype=np.float64)
+        return cls(
+            xs=0.5 + radii * np.cos(angles),
+            ys=0.5 + radii * np.sin(angles),
+            footprint=footprint,
+        )
+
+    @classmethod
+    def circular(cls, strip_count: int, samples_per_strip: int) -> Self:
+        """Concentric circles with increasing radius, the center is left unscanned."""
+        footprint = 1 / (2 * strip_count + 1)
+        radii = np.arange(1, strip_count + 1)[:, np.newaxis] * footprint
+        angles = np.linspace(0, 2 * np.pi, samples_per_strip, endpoint=False)[np.newaxis, :]
+        return cls.from_polar(*np.broadcast_arrays(radii, angles), footprint=footprint)
+
+    @classmethod
+    def spiral(cls, strip_count: int, samples_per_strip: int, turns: float | None = None) -> Self:
+        """
+        Archimedean spiral walked from the center outwards, split into equally long strips.
+
+        Defaults to one turn per strip.
+        """
+        footprint = 1 / (2 * strip_count + 1)
+        turns = strip_count if turns is None else turns
+        t = np.linspace(0, 1, strip_count * samples_per_strip + 1)[1:]
+        radii = t * strip_count * footprint
+        angles = t * turns * 2 * np.pi
+        return cls.from_polar(
+            radii.reshape(strip_count, samples_per_strip),
+            angles.reshape(strip_count, samples_per_strip),
+            footprint=footprint,
+        )
+
+    @classmethod
+    def radial(cls, strip_count: int, samples_per_strip: int) -> Self:
+        """Rays from the center outwards, sweeping clockwise (on screen) one ray per strip."""
+        footprint = 1 / (2 * samples_per_strip + 1)
+        radii = np.arange(1, samples_per_strip + 1)[np.newaxis, :] * footprint
+        angles = np.linspace(0, 2 * np.pi, strip_count, endpoint=False)[:, np.newaxis]
+        return cls.from_polar(*np.broadcast_arrays(radii, angles), footprint=footprint)
@@ -1,15 +1,21 @@
-from dataclasses import dataclass
+from abc import abstractmethod
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 import logging
-from typing import cast
 
-import cv2
 import numpy as np
+import numpy.typing as npt
 
-from owl.converters.utils import grayscale
-from owl.soundgen import MultiSineGen
+from owl.converters.utils import FrameProduct, PreprocessedFrame
+from owl.soundgen import MultiSineBlockGen, MultiSineGen
 from owl.types import Frame, Signal
 
 from .base import DynamicConverter
+from .sampling import SamplingMap
+
+
+if TYPE_CHECKING:
+    from owl.trace import StripTrace
 
 
 logger = logging.getLogger("scan_converter")
@@ -21,84 +27,153 @@ class ScanConverter(DynamicConverter):
 
     strip_count: int
     frequencies: list[float]
+    matrix_rendering: bool = True
+    trace: "StripTrace | None" = field(default=None, kw_only=True)  # records every frame's volume matrix
 
     def __post_init__(self) -> None:
         super().__post_init__()
 
-        self._sound_gen = MultiSineGen(self.frequencies)
-        self._samples_per_strip = int(
-            self.ms_per_frame / 1000 * self._sound_gen.sample_rate / self.strip_count
+        self._sound_gen = MultiSineGen(self.frequencies, sample_rate=self.sample_rate)
+        self._samples_per_strip = self._compute_samples_per_strip()
+        self._block_gen = MultiSineBlockGen(
+            self.frequencies,
+            block_count=self.strip_count,
+            samples_per_block=self._samples_per_strip,
+            sample_rate=self.sample_rate,
         )
 
+    def reconfigure(self, *, frequencies: list[float] | None = None, ms_per_frame: int | None = None) -> None:
+        """
+        Change frequencies or frame duration in place, keeping oscillator phases and volumes.
+
+        The number of frequencies has to stay the same. Waits for a frame being
+        prerendered to finish, so it's rendered with either configuration.
+        """
+        with self._render_lock:
+            if frequencies is not None:
+                assert len(frequencies) == len(self.frequencies)
+                self.frequencies = frequencies
+                self._sound_gen.set_frequencies(frequencies, transient_duration=0)
+            if ms_per_frame is not None:
+                self.ms_per_frame = ms_per_frame
+                self._samples_per_strip = self._compute_samples_per_strip()
+
+            self._block_gen = self._block_gen.reshaped(
+                freqs=self.frequencies, samples_per_block=self._samples_per_strip
+            )
+
+    @property
+    def transient_duration(self) -> float:
+        """Volume crossfade at the start of each strip."""
+        return self._block_gen.transient_duration
+
+    def _compute_samples_per_strip(self) -> int:
+        return int(self.ms_per_frame / 1000 * self.sample_rate / self.strip_count)
+
+    def render_strips(self, volumes: npt.NDArray[np.floating]) -> Signal:
+        """
+        Render a frame's audio from a `(strip_count, len(frequencies))` volume matrix.
+
+        Strips are played in order, each for `ms_per_frame / strip_count` ms.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, strip_volumes in enumerate(volumes):
+                logger.debug("strip[%d] volumes: %s", i, " ".join(f"{v:.02f}" for v in strip_volumes))
+
+        if self.matrix_rendering:
+            signal = self._block_gen.render(volumes)
+        else:
+            signal = np.empty(shape=[0], dtype=np.float32)
+            for strip_volumes in volumes:
+                self._sound_gen.set_volumes(strip_volumes, transient_duration=0.01)
+                signal = np.concatenate(
+                    [signal, self._sound_gen.get_next_samples(self._samples_per_strip)]
+                )
+
+        if self.trace is not None:
+            self.trace.append(volumes, len(signal) / self.sample_rate)
+        return signal
+
 
 class HorizontalScanConverter(ScanConverter):
     """Scan image horizontally, each strip being a vertical line"""
 
-    def convert_frame(self, frame: Frame) -> Signal:
-        frame = grayscale(frame)
-        self.emit("new-input-frame", frame)
-        frame = cast(Frame, cv2.resize(frame, (self.strip_count, len(self.frequencies)), interpolation=cv2.INTER_AREA))
-        self.emit("new-converter-frame", frame)
-
-        signal = np.empty(shape=[0], dtype=np.float32)
-        for i in range(self.strip_count):
-            # take i-th column, bottom to top
-            volumes = frame[::-1, i] / 255
-            logger.debug(f"strip[{i}] volumes: {' '.join(f'{v:.02f}' for v in volumes)}")
-            self._sound_gen.set_volumes(volumes, transient_duration=0.01)
-            signal = np.concatenate(
-                [signal, self._sound_gen.get_next_samples(self._samples_per_strip)]
-            )
-        return signal
+    def required_products(self) -> list[FrameProduct]:
+        return [FrameProduct("stretched", (self.strip_count, len(self.frequencies)))]
+
+    def convert_frame(self, frame: Frame | PreprocessedFrame) -> Signal:
+        preprocessed = self.preprocess(frame)
+        self.preview.publish("new-input-frame", lambda: preprocessed.gray)
+        frame = preprocessed.stretched(self.strip_count, len(self.frequencies))
+        self.preview.publish("new-converter-frame", lambda: frame)
+
+        # i-th strip is the i-th column, bottom to top
+        return self.render_strips(frame[::-1].T / 255)
 
 
 class VerticalScanConverter(ScanConverter):
     """Scan image vertically, each strip being a horizontal line"""
 
-    def convert_frame(self, frame: Frame) -> Signal:
-        frame = grayscale(frame)
-        self.emit("new-input-frame", frame)
-        frame = cast(Frame, cv2.resize(frame, (len(self.frequencies), self.strip_count), interpolation=cv2.INTER_AREA))
-        self.emit("new-converter-frame", frame)
-
-        signal = np.empty(shape=[0], dtype=np.float32)
-        for i in range(self.strip_count):
-            # take i-th row from bottom
-            volumes = frame[self.strip_count - i - 1] / 255
-            logger.debug(f"strip[{i}] volumes: {' '.join(f'{v:.02f}' for v in volumes)}")
-            self._sound_gen.set_volumes(volumes, transient_duration=0.01)
-            signal = np.concatenate(
-                [signal, self._sound_gen.get_next_samples(self._samples_per_strip)]
-            )
-        return signal
+    def required_products(self) -> list[FrameProduct]:
+        return [FrameProduct("stretched", (len(self.frequencies), self.strip_count))]
+
+    def convert_frame(self, frame: Frame | PreprocessedFrame) -> Signal:
+        preprocessed = self.preprocess(frame)
+        self.preview.publish("new-input-frame", lambda: preprocessed.gray)
+        frame = preprocessed.stretched(len(self.frequencies), self.strip_count)
+        self.preview.publish("new-converter-frame", lambda: frame)
+
+        # i-th strip is the i-th row from bottom
+        return self.render_strips(frame[::-1] / 255)
+
+
+class SampledScanConverter(ScanConverter):
+    """Scan image along a fixed path described by a `SamplingMap`
 
+    The map is built once, frames are then sampled at source resolution.
+    Subclass and implement `build_sampling_map` to scan along a custom path.
+    """
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self._sampling_map = self.build_sampling_map()
+        assert self._sampling_map.xs.shape == (self.strip_count, len(self.frequencies))
+
+    @abstractmethod
+    def build_sampling_map(self) -> SamplingMap:
+        ...
+
+    def required_products(self) -> list[FrameProduct]:
+        return [FrameProduct("gray")]
+
+    def convert_frame(self, frame: Frame | PreprocessedFrame) -> Signal:
+        gray = self.preprocess(frame).gray
+        self.preview.publish("new-input-frame", lambda: gray)
+        volumes = self._sampling_map.sample(gray)
+        self.preview.publish("new-converter-frame", lambda: (volumes * 255).astype(np.uint8))
+
+        return self.render_strips(volumes)
 
-class CircularScanConverter(ScanConverter):
+
+class CircularScanConverter(SampledScanConverter):
     """Scan image with circles with increasing size
 
-    Center pixel of the resized image is purposely left unscanned.
+    Center of the image is purposely left unscanned.
     """
 
-    def convert_frame(self, frame: Frame) -> Signal:
-        center = self.strip_count
-        side_length = self.strip_count * 2 + 1
-
-        frame = grayscale(frame)
-        self.emit("new-input-frame", frame)
-        frame = cast(Frame, cv2.resize(frame, (side_length, side_length), interpolation=cv2.INTER_AREA))
-        self.emit("new-converter-frame", frame)
-
-        signal = np.empty(shape=[0], dtype=np.float32)
-        for i in range(1, self.strip_count + 1):
-            angles = np.linspace(0, 360, len(self.frequencies), endpoint=False)
-            xs = np.rint(i * np.cos(angles * np.pi / 180) + center).astype(int)
-            ys = np.rint(i * np.sin(angles * np.pi / 180) + center).astype(int)
-            volumes = frame[ys, xs] / 255
-            logger.debug(f"strip[{i}] volumes: {' '.join(f'{v:.02f}' for v in volumes)}")
-
-            self._sound_gen.set_volumes(volumes, transient_duration=0.01)
-            signal = np.concatenate(
-                [signal, self._sound_gen.get_next_samples(self._samples_per_strip)]
-            )
+    def build_sampling_map(self) -> SamplingMap:
+        return SamplingMap.circular(self.strip_count, len(self.frequencies))
 
-        return signal
+
+class SpiralScanConverter(SampledScanConverter):
+    """Scan image along a spiral from the center outwards, one turn per strip"""
+
+    def build_sampling_map(self) -> SamplingMap:
+        return SamplingMap.spiral(self.strip_count, len(self.frequencies))
+
+
+class RadialScanConverter(SampledScanConverter):
+    """Scan image with rays from the center outwards, each strip being a ray"""
+
+    def build_sampling_map(self) -> SamplingMap:
+        return SamplingMap.radial(self.strip_count, len(self.frequencies))
@@ -1,13 +1,105 @@
+from dataclasses import dataclass, field
+from typing import cast
+
+import numpy as np
+
+from owl.types import Frame, Signal
+
 from .converter import BaseConverter
+from .utils import PreprocessedFrame, make_square, square_resize
 
 
+@dataclass(kw_only=True)
 class BaseFocusConverter(BaseConverter):
-    def __init__(self) -> None:
-        self._cursor_position = (0, 0)
+    """
+    Converter with a point of attention (cursor), e.g. the mouse, gaze or a tracked object
+
+    Cursor position is normalized to the frame, `(0, 0)` being the top-left
+    and `(1, 1)` the bottom-right corner.
+    """
+
+    roi_size: float = 0.25  # side of the square region of interest, relative to the shorter frame side
+
+    _cursor_position: tuple[float, float] = field(default=(0.5, 0.5), init=False)
 
     @property
-    def cursor_position(self) -> tuple[int, int]:
+    def cursor_position(self) -> tuple[float, float]:
         return self._cursor_position
 
-    def on_cursor_move(self, position: tuple[int, int]) -> None:
-        self._cursor_position = position
+    def on_cursor_move(self, position: tuple[float, float]) -> None:
+        x, y = position
+        self._cursor_position = (min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0))
+
+    def crop_roi(self, frame: Frame) -> Frame:
+        """Square region of interest around the cursor, shifted to fit within the frame (no copy)."""
+        height, width = frame.shape[:2]
+        side_length = max(int(self.roi_size * min(width, height)), 1)
+
+        x, y = self._cursor_position
+        left = min(max(int(x * width) - side_length // 2, 0), width - side_length)
+        top = min(max(int(y * height) - side_length // 2, 0), height - side_length)
+        return cast(Frame, frame[top : top + side_length, left : left + side_length])
+
+    @staticmethod
+    def downscale(frame: Frame, side_length: int) -> Frame:
+        """
+        Square-crop and downscale a frame to `side_length`.
+
+        Large frames are decimated first so the area resize never touches
+        much more than `4 * side_length` pixels per side.
+        """
+        frame = make_square(frame)
+        step = max(frame.shape[0] // (4 * side_length), 1)
+        return square_resize(cast(Frame, frame[::step, ::step]), side_length)
+
+
+@dataclass(kw_only=True)
+class FocusConverter(BaseFocusConverter):
+    """
+    Sonify the region of interest in detail and the rest of the frame coarsely
+
+    Only the ROI crop is passed to `detail_converter`, the (optional)
+    `periphery_converter` gets the whole frame downscaled to
+    `periphery_resolution`. Both outputs are mixed, so cost of the detailed
+    conversion doesn't depend on the input resolution.
+    """
+
+    detail_converter: BaseConverter
+    periphery_converter: BaseConverter | None = None
+    periphery_resolution: int = 16
+    detail_gain: float = 1.0
+    periphery_gain: float = 0.3
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+
+        # subscribe to detail converter previews only once somebody subscribes to ours
+        self._forwarded_previews: set[str] = set()
+        self.on("new_listener", self._forward_detail_preview)
+
+    def update(self, frame: Frame | PreprocessedFrame) -> None:
+        preprocessed = self.preprocess(frame)
+        self.preview.publish("new-input-frame", lambda: preprocessed.gray)
+
+        self.detail_converter.update(self.crop_roi(preprocessed.frame))
+        if self.periphery_converter is not None:
+            self.periphery_converter.update(self.downscale(preprocessed.frame, self.periphery_resolution))
+
+    def get_samples(self, count: int) -> Signal:
+        signal = self.detail_converter.get_samples(count) * self.detail_gain
+        if self.periphery_converter is not None:
+            signal = signal + self.periphery_converter.get_samples(count) * self.periphery_gain
+        return cast(Signal, np.asarray(signal, dtype=np.float32))
+
+    def close(self) -> None:
+        self.detail_converter.close()
+        if self.periphery_converter is not None:
+            self.periphery_converter.close()
+
+    def _forward_detail_preview(self, event: str, listener: object) -> None:
+        detail_event = {"new-roi-frame": "new-input-frame", "new-converter-frame": "new-converter-frame"}.get(event)
+        if detail_event is None or event in self._forwarded_previews:
+            return
+
+        self._forwarded_previews.add(event)
+        self.detail_converter.on(detail_event, lambda frame: self.emit(event, frame))
@@ -0,0 +1,46 @@
+from collections.abc import Callable
+import time
+
+import cv2
+from pyee import EventEmitter
+
+from owl.types import Frame
+
+
+class PreviewChannel:
+    """
+    Opt-in, rate-limited preview frames of a converter
+
+    Frames are produced by `make_frame` callbacks only if the event has a
+    listener and at most `fps` times per second, so headless runs don't pay
+    for previews at all. Published frames are copies, downscaled to fit
+    into `max_side x max_side`.
+    """
+
+    def __init__(self, emitter: EventEmitter, fps: float = 15.0, max_side: int = 480):
+        self._emitter = emitter
+        self.fps = fps
+        self.max_side = max_side
+        self._last_published: dict[str, float] = {}
+
+    def wants(self, event: str) -> bool:
+        if not self._emitter.listeners(event):
+            return False
+        last_published = self._last_published.get(event)
+        return last_published is None or time.monotonic() - last_published >= 1 / self.fps
+
+    def publish(self, event: str, make_frame: Callable[[], Frame]) -> None:
+        if not self.wants(event):
+            return
+
+        self._last_published[event] = time.monotonic()
+        self._emitter.emit(event, self._downscale(make_frame()))
+
+    def _downscale(self, frame: Frame) -> Frame:
+        height, width = frame.shape[:2]
+        if max(height, width) <= self.max_side:
+            return frame.copy()
+
+        scale = self.max_side / max(height, width)
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
@@ -1,12 +1,27 @@
-from .base import SineConverter
-from .curve import CurveConverter
-from .shifters import ShiftersConverter
-from .spread import HilbertSpreadConverter
-
-
-__all__ = [
-    "SineConverter",
-    "CurveConverter",
-    "ShiftersConverter",
-    "HilbertSpreadConverter",
-]
+from typing import TYPE_CHECKING, Any
+import importlib
+
+
+if TYPE_CHECKING:
+    from .base import SineConverter
+    from .curve import CurveConverter
+    from .clustering import ClusteringMode
+    from .shifters import ShiftersConverter
+    from .spread import HilbertSpreadConverter
+
+
+_modules = {
+    "SineConverter": ".base",
+    "CurveConverter": ".curve",
+    "ShiftersConverter": ".shifters",
+    "ClusteringMode": ".clustering",
+    "HilbertSpreadConverter": ".spread",
+}
+
+__all__ = list(_modules)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_modules[name], __name__), name)
@@ -1,11 +1,20 @@
 from abc import abstractmethod
 from collections.abc import Sequence
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
 
 from owl.soundgen import MultiSineGen
 from owl.types import Frame, Signal
 
 from ..converter import BaseConverter
+from ..utils import PreprocessedFrame
+
+
+if TYPE_CHECKING:
+    from owl.trace import SineTrace
 
 
 @dataclass
@@ -14,29 +23,64 @@ class Sine:
     volume: float
 
 
+# (frequencies, volumes), both one-dimensional and of equal length
+SineArrays = tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]
+
+
+def sines_to_arrays(sines: Sequence[Sine]) -> SineArrays:
+    """Convert the legacy list of `Sine`s to `(frequencies, volumes)` arrays."""
+    frequencies = np.fromiter((sine.frequency for sine in sines), dtype=np.float64, count=len(sines))
+    volumes = np.fromiter((sine.volume for sine in sines), dtype=np.float64, count=len(sines))
+    return frequencies, volumes
+
+
 @dataclass
 class SineConverter(BaseConverter):
     sine_gen: MultiSineGen
     transient_duration: float
+    trace: "SineTrace | None" = field(default=None, kw_only=True)  # records every frame's frequencies and volumes
 
     _first_frame: bool = field(init=False, default=True)
 
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        # a generator running at another rate would shift every frequency by the ratio of the rates
+        if self.sine_gen.sample_rate != self.sample_rate:
+            raise Exception(
+                f"sine generator runs at {self.sine_gen.sample_rate}Hz, the converter at {self.sample_rate}Hz"
+            )
+
     @property
     def sine_count(self) -> int:
         return len(self.sine_gen.freqs)
 
-    def update(self, frame: Frame) -> None:
+    def update(self, frame: Frame | PreprocessedFrame) -> None:
         sines = self._extract_sines(frame)
-        assert len(sines) == len(self.sine_gen.freqs)
+        if isinstance(sines, tuple):
+            frequencies, volumes = sines
+        else:
+            # compatibility with subclasses still returning a list of `Sine`s
+            frequencies, volumes = sines_to_arrays(sines)
+        assert len(frequencies) == len(volumes) == len(self.sine_gen.freqs)
 
         transient_duration = 0 if self._first_frame else self.transient_duration
         self._first_frame = False
-        self.sine_gen.set_frequencies((sine.frequency for sine in sines), transient_duration=transient_duration)
-        self.sine_gen.set_volumes((sine.volume for sine in sines), transient_duration=transient_duration)
+        self.sine_gen.set_frequencies(frequencies, transient_duration=transient_duration)
+        self.sine_gen.set_volumes(volumes, transient_duration=transient_duration)
+        if self.trace is not None:
+            self.trace.append(frequencies, volumes)
 
     def get_samples(self, count: int) -> Signal:
+        if self.trace is not None:
+            self.trace.advance(count)
         return self.sine_gen.get_next_samples(count)
 
     @abstractmethod
-    def _extract_sines(self, frame: Frame) -> Sequence[Sine]:
+    def _extract_sines(self, frame: Frame | PreprocessedFrame) -> SineArrays | Sequence[Sine]:
+        """
+        Extract frequencies and volumes of all sines from a frame.
+
+        Should return a `(frequencies, volumes)` tuple of arrays. Returning a
+        sequence of `Sine`s is still supported, but slower.
+        """
         ...
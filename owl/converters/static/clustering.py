@@ -0,0 +1,8 @@
+from enum import StrEnum
+
+
+# kept apart from the shifters converter (and OpenCV) so the CLI can list the modes without importing it
+class ClusteringMode(StrEnum):
+    KMEANS = "kmeans"
+    INCREMENTAL_KMEANS = "incremental-kmeans"
+    ISLANDS = "islands"
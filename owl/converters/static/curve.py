@@ -1,29 +1,30 @@
 from dataclasses import dataclass
 
-import cv2
-
 from owl.frequency_curve import FrequencyCurve
 from owl.types import Frame
 
-from ..utils import make_square
-from .base import Sine, SineConverter
+from ..utils import FrameProduct, PreprocessedFrame
+from .base import SineArrays, SineConverter
 
 
 @dataclass
 class CurveConverter(SineConverter):
     frequency_curve: FrequencyCurve
 
-    def _extract_sines(self, frame: Frame) -> list[Sine]:
-        frame = make_square(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    def set_frequency_curve(self, frequency_curve: FrequencyCurve) -> None:
+        """Switch to a same-sized frequency curve in place, gliding oscillators to the new frequencies."""
+        assert frequency_curve.side_length == self.frequency_curve.side_length
+        self.frequency_curve = frequency_curve
+        self.sine_gen.set_frequencies(frequency_curve.frequencies, transient_duration=self.transient_duration)
+
+    def required_products(self) -> list[FrameProduct]:
+        return [FrameProduct("resized", self.frequency_curve.side_length)]
 
-        side_length = self.frequency_curve.side_length
-        resized_frame = cv2.resize(
-            frame, (side_length, side_length), interpolation=cv2.INTER_AREA
-        )
-        self.emit("new-input-frame", frame)
-        self.emit("new-converter-frame", resized_frame)
+    def _extract_sines(self, frame: Frame | PreprocessedFrame) -> SineArrays:
+        preprocessed = self.preprocess(frame)
+        resized_frame = preprocessed.resized(self.frequency_curve.side_length)
+        self.preview.publish("new-input-frame", lambda: preprocessed.square)
+        self.preview.publish("new-converter-frame", lambda: resized_frame)
 
-        return [
-            Sine(frequency=freq, volume=resized_frame[y][x] / 255)
-            for (x, y), freq in self.frequency_curve
-        ]
+        xs, ys = self.frequency_curve.coordinates
+        return self.frequency_curve.frequency_array, resized_frame[ys, xs] / 255
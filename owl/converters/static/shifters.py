@@ -1,13 +1,24 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import cv2
 import numpy as np
+import numpy.typing as npt
 
 from owl.frequency_curve import FrequencyCurve
 from owl.types import Frame
 
-from ..utils import grayscale, make_square, median_threshold, square_resize
-from .base import Sine, SineConverter
+from ..utils import FrameProduct, PreprocessedFrame
+from .base import SineArrays, SineConverter
+from .clustering import ClusteringMode
+
+
+def _term_criteria(count_criterion: int | None, eps_criterion: float | None) -> tuple[int, int, float]:
+    criteria_flags = 0
+    if count_criterion is not None:
+        criteria_flags += cv2.TermCriteria_COUNT
+    if eps_criterion is not None:
+        criteria_flags += cv2.TermCriteria_EPS
+    return criteria_flags, count_criterion or 0, eps_criterion or 0
 
 
 def kmeans(
@@ -28,17 +39,11 @@ def kmeans(
     if not data:
         return {}
 
-    criteria_flags = 0
-    if count_criterion is not None:
-        criteria_flags += cv2.TermCriteria_COUNT
-    if eps_criterion is not None:
-        criteria_flags += cv2.TermCriteria_EPS
-
     _, classes, centers = cv2.kmeans(
         np.array(data, dtype=np.float32),
         k,
         None,  # type: ignore
-        criteria=(criteria_flags, count_criterion or 0, eps_criterion or 0),
+        criteria=_term_criteria(count_criterion, eps_criterion),
         attempts=attempts,
         flags=0,
     )
@@ -52,36 +57,144 @@ def kmeans(
     return {center: count / total_count for center, count in center_counts.items()}
 
 
+def islands(frame: Frame, k: int) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float64]]:
+    """
+    Find the `k` largest connected components (islands) of a thresholded frame.
+
+    Returns `k` island centroids as `(x, y)` rows and their weights (island
+    area relative to all foreground pixels). If there are less than `k`
+    islands, the rest is padded with zero-weight centers at the origin.
+    """
+    count, _, stats, centroids = cv2.connectedComponentsWithStats(frame, connectivity=8)
+
+    # label 0 is the background
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    largest = np.argsort(areas, kind="stable")[::-1][:k]
+
+    centers = np.zeros((k, 2), dtype=np.float32)
+    weights = np.zeros(k, dtype=np.float64)
+    centers[: len(largest)] = centroids[1:][largest]
+    if (total_area := areas.sum()) > 0:
+        weights[: len(largest)] = areas[largest] / total_area
+    return centers, weights
+
+
+@dataclass
+class IncrementalKMeans:
+    """
+    K-means over foreground pixels, warm-started from the previous frame's centers.
+
+    The first frame (or a frame following one without enough foreground pixels)
+    is clustered from scratch with `cold_attempts` attempts. Following frames
+    label pixels by their nearest previous center and refine that labelling with
+    a single attempt, which converges in very few iterations on video input.
+    """
+
+    k: int
+    cold_attempts: int = 5
+    count_criterion: int | None = 50
+    eps_criterion: float | None = 0.1
+
+    _centers: npt.NDArray[np.float32] | None = field(default=None, init=False)
+
+    def reset(self) -> None:
+        self._centers = None
+
+    def fit(self, frame: Frame) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float64]]:
+        """
+        Cluster non-zero pixels of `frame`.
+
+        Returns `k` centers as `(x, y)` rows and their weights (relative
+        cluster sizes). Weights sum up to 1 unless the frame is blank.
+        """
+        ys, xs = np.nonzero(frame)
+        data = np.column_stack((xs, ys)).astype(np.float32)
+
+        if len(data) < self.k:
+            # not enough points to cluster, each point becomes its own center
+            centers = np.zeros((self.k, 2), dtype=np.float32) if self._centers is None else self._centers.copy()
+            centers[: len(data)] = data
+            weights = np.zeros(self.k, dtype=np.float64)
+            weights[: len(data)] = 1 / max(len(data), 1)
+            self._centers = None
+            return centers, weights
+
+        criteria = _term_criteria(self.count_criterion, self.eps_criterion)
+        if self._centers is None:
+            _, labels, centers = cv2.kmeans(
+                data,
+                self.k,
+                None,  # type: ignore
+                criteria=criteria,
+                attempts=self.cold_attempts,
+                flags=0,
+            )
+        else:
+            # seed labels from the nearest center of the previous frame
+            distances = ((data[:, np.newaxis, :] - self._centers[np.newaxis, :, :]) ** 2).sum(axis=2)
+            initial_labels = distances.argmin(axis=1).astype(np.int32).reshape(-1, 1)
+            _, labels, centers = cv2.kmeans(
+                data,
+                self.k,
+                initial_labels,
+                criteria=criteria,
+                attempts=1,
+                flags=cv2.KMEANS_USE_INITIAL_LABELS,
+            )
+
+        self._centers = centers
+        counts = np.bincount(labels.ravel(), minlength=self.k)
+        return centers, counts / len(data)
+
+
 @dataclass
 class ShiftersConverter(SineConverter):
-    """K-means brightest points on frequency curve"""
+    """K-means (or largest islands of) brightest points on frequency curve"""
 
     frequency_curve: FrequencyCurve
     intensity_levels: int
+    clustering: ClusteringMode = ClusteringMode.KMEANS
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self._incremental_kmeans = IncrementalKMeans(k=self.sine_count)
+
+    def set_frequency_curve(self, frequency_curve: FrequencyCurve) -> None:
+        """Switch to a same-sized frequency curve in place, takes effect with the next frame."""
+        assert frequency_curve.side_length == self.frequency_curve.side_length
+        self.frequency_curve = frequency_curve
+
+    def required_products(self) -> list[FrameProduct]:
+        return [FrameProduct("thresholded", self.frequency_curve.side_length)]
 
-    def _extract_sines(self, frame: Frame) -> list[Sine]:
+    def _extract_sines(self, frame: Frame | PreprocessedFrame) -> SineArrays:
         side_length = self.frequency_curve.side_length
-        frame = make_square(frame)
-        original_size_length = frame.shape[0]
-        frame = square_resize(frame, side_length)
-        frame = grayscale(frame)
-        self.emit("new-input-frame", square_resize(frame, original_size_length))
-        frame = median_threshold(frame)
-
-        # TODO: threshold wiht 50% (80%?), then extract islands and map their size to volume
-        center_weights = kmeans(frame, self.sine_count)
-        for center, weight in center_weights.items():
-            cv2.circle(frame, [int(x/side_length*frame.shape[0]) for x in center], int(weight**2 * 50), color=(0, 0, 0))
-        self.emit("new-converter-frame", square_resize(frame, original_size_length))
-
-        sines: list[Sine] = []
-        for (x, y), weight in center_weights.items():
-            point = (int(x), int(y))
-
-            frequency = self.frequency_curve.get_frequency(point)
-            if frequency is None:
-                raise Exception(f"k-means: Point {point} out of curve bounds ({side_length})")
-            sines.append(Sine(frequency, volume=weight**2))
-
-        sines.sort(key=lambda x: x.frequency)
-        return sines
+        preprocessed = self.preprocess(frame)
+        self.preview.publish("new-input-frame", lambda: preprocessed.square)
+        frame = preprocessed.thresholded(side_length)
+
+        if self.clustering == ClusteringMode.ISLANDS:
+            centers, weights = islands(frame, self.sine_count)
+        elif self.clustering == ClusteringMode.INCREMENTAL_KMEANS:
+            centers, weights = self._incremental_kmeans.fit(frame)
+        else:
+            center_weights = kmeans(frame, self.sine_count)
+            centers = np.array(list(center_weights.keys()), dtype=np.float32).reshape(-1, 2)
+            weights = np.fromiter(center_weights.values(), dtype=np.float64, count=len(center_weights))
+
+        def draw_centers() -> Frame:
+            preview = frame.copy()
+            for center, weight in zip(centers, weights):
+                cv2.circle(preview, [int(x) for x in center], int(weight**2 * 50), color=(0, 0, 0))
+            return preview
+
+        self.preview.publish("new-converter-frame", draw_centers)
+
+        points = centers.astype(np.intp)
+        if ((points < 0) | (points >= side_length)).any():
+            raise Exception(f"k-means: Points {points.tolist()} out of curve bounds ({side_length})")
+        frequencies = self.frequency_curve.get_frequencies(points[:, 0], points[:, 1])
+        volumes = weights**2
+
+        order = np.argsort(frequencies, kind="stable")
+        return frequencies[order], volumes[order]
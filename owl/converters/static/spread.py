@@ -1,49 +1,68 @@
 from collections.abc import Iterator
+from dataclasses import dataclass
 import itertools
 
-import cv2
+import numpy as np
 
 from owl.curves import HilbertCurve
+from owl.frequency_curve import FrequencyCurve
 from owl.types import Frame
 
-from ..utils import make_square
-from .base import Sine, SineConverter
+from ..utils import FrameProduct, PreprocessedFrame
+from .base import SineArrays, SineConverter
 
 
+@dataclass
 class HilbertSpreadConverter(SineConverter):
     """
     Combine hilbert curves of N orders, each mapping pixels
     to more spread frequencies
+
+    Level `i` of the image pyramid has `2**i x 2**i` pixels and is walked by a
+    hilbert curve of order `i`. Frequencies of pixels in level `i + 1` are
+    spread around the frequency of their parent pixel in level `i`.
     """
 
-    def __init__(self, base_freq: float, order: int, transient_duration: float):
-        self._base_freq = base_freq
-        self._order = order
+    base_frequency: float
+    order: int
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
 
-        self._all_freqs = list(
-            itertools.chain.from_iterable(
-                self.generate_frequency_groups(base_freq, order)
+        self._levels = [
+            FrequencyCurve(HilbertCurve(order=level), frequencies)
+            for level, frequencies in enumerate(
+                self.generate_frequency_groups(self.base_frequency, self.order)
             )
-        )
-        super().__init__(len(self._all_freqs), transient_duration=transient_duration)
+        ]
+        self._frequencies = np.concatenate([level.frequency_array for level in self._levels])
+        assert len(self._frequencies) == self.sine_count
 
-    def _extract_sines(self, frame: Frame) -> list[Sine]:
-        frame = make_square(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    def required_products(self) -> list[FrameProduct]:
+        return [FrameProduct("pyramid", self._levels[-1].side_length)]
 
-        volumes: list[float] = []
-        frames = []
-        for side_length in (2**i for i in itertools.count()):
-            resized_frame = cv2.resize(
-                frame, (side_length, side_length), interpolation=cv2.INTER_AREA
-            )
-            frames.append(resized_frame)
+    def _extract_sines(self, frame: Frame | PreprocessedFrame) -> SineArrays:
+        preprocessed = self.preprocess(frame)
+        self.preview.publish("new-input-frame", lambda: preprocessed.square)
+
+        # each level of the pyramid is derived from the next larger one
+        pyramid = preprocessed.pyramid(self._levels[-1].side_length)
+        self.preview.publish("new-converter-frame", lambda: pyramid[-1])
 
-            curve = HilbertCurve(order=side_length - 1)
-            for point in curve.generate():
-                volumes.extend(resized_frame[point] / 255)
+        volumes = np.concatenate([
+            level_frame[level.coordinates[1], level.coordinates[0]]
+            for level, level_frame in zip(self._levels, pyramid)
+        ])
+        return self._frequencies, volumes / 255
 
-        # notify("converter:outputs", frames)
-        return [Sine(frequency=f, volume=v) for f, v in zip(self._all_freqs, volumes)]
+    @classmethod
+    def generate_frequencies(cls, base_freq: float, order: int) -> list[float]:
+        frequencies = list(itertools.chain.from_iterable(cls.generate_frequency_groups(base_freq, order)))
+        # coinciding oscillators would sum into one louder tone and make their pixels indistinguishable
+        ratios = np.diff(np.log(np.sort(frequencies)))
+        if np.any(ratios < 1e-9):
+            raise Exception(f"spread frequencies of order {order} overlap")
+        return frequencies
 
     @staticmethod
     def generate_frequency_groups(
@@ -62,9 +81,11 @@ class HilbertSpreadConverter(SineConverter):
         for _ in range(order):
             yield freqs
 
-            freq_ratio **= -4
             freqs = list(
                 itertools.chain.from_iterable(
                     [spread(freq, freq_ratio) for freq in freqs]
                 )
             )
+            # children of neighbouring pixels shouldn't overlap: neighbours are at least `freq_ratio` apart and
+            # children span `new_ratio ** 4` between them, so that has to stay below `freq_ratio`
+            freq_ratio **= 1 / 5
@@ -1,13 +1,19 @@
-from typing import cast
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Literal, cast
 
 import cv2
 import numpy as np
+import numpy.typing as npt
 
 from owl.types import Frame
 
 
-def grayscale(frame: Frame) -> Frame:
-    return cast(Frame, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+def grayscale(frame: Frame, dst: Frame | None = None) -> Frame:
+    if frame.ndim == 2:
+        return frame
+    return cast(Frame, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=dst))
 
 
 def make_square(frame: Frame) -> Frame:
@@ -27,19 +33,188 @@ def make_square(frame: Frame) -> Frame:
     return cast(Frame, squared_frame)
 
 
-def median_threshold(frame: Frame) -> Frame:
-    median = np.median(frame)
-    return np.where(
-        frame > median,
-        np.full_like(frame, 255, dtype=np.uint8),
-        np.zeros_like(frame, dtype=np.uint8),
-    )
+def histogram_median(frame: Frame) -> float:
+    """
+    Median of a uint8 frame, computed from its histogram instead of sorting.
+
+    Equal to `np.median(frame)`, including averaging of the two middle values.
+    """
+    histogram = cv2.calcHist([frame], [0], None, [256], [0, 256]).ravel()
+    cumulative = np.cumsum(histogram)
+    count = int(cumulative[-1])
+    lower = int(np.searchsorted(cumulative, (count - 1) // 2, side="right"))
+    upper = int(np.searchsorted(cumulative, count // 2, side="right"))
+    return (lower + upper) / 2
+
+
+def median_threshold(frame: Frame, dst: Frame | None = None) -> Frame:
+    median = histogram_median(frame)
+    # pixels are integers, so `> median` is the same as `> floor(median)`
+    _, thresholded = cv2.threshold(frame, int(median), 255, cv2.THRESH_BINARY, dst=dst)
+    return cast(Frame, thresholded)
 
 
-def square_resize(frame: Frame, side_length: int) -> Frame:
+def square_resize(frame: Frame, side_length: int, dst: Frame | None = None) -> Frame:
     resized_frame = cv2.resize(
         frame,
         (side_length, side_length),
+        dst=dst,
         interpolation=cv2.INTER_AREA,
     )
     return cast(Frame, resized_frame)
+
+
+@dataclass(frozen=True)
+class FrameProduct:
+    """
+    Intermediate product of frame preprocessing a converter depends on
+
+    - `gray`: grayscale frame
+    - `square`: grayscale frame cropped to a centered square
+    - `stretched`: grayscale frame resized to `size` (width, height), ignoring aspect ratio
+    - `resized`: square frame resized to `size` (side length)
+    - `thresholded`: resized frame thresholded by its median
+    - `pyramid`: levels of side lengths `size`, `size // 2`, ..., each derived from the previous one
+    """
+
+    kind: Literal["gray", "square", "stretched", "resized", "thresholded", "pyramid"]
+    size: int | tuple[int, int] | None = None
+
+
+class PreprocessedFrame:
+    """
+    Input frame with lazily computed, memoized preprocessing products
+
+    Products may live in buffers reused by the owning `Preprocessor`, they
+    stay valid until it has processed two more frames. Copy them if they
+    need to live longer.
+    """
+
+    def __init__(self, frame: Frame, preprocessor: "Preprocessor | None" = None, buffer_slot: int = 0):
+        self.frame = frame
+        self._preprocessor = preprocessor
+        self._buffer_slot = buffer_slot
+        self._products: dict[FrameProduct, Frame | list[Frame]] = {}
+
+    @cached_property
+    def gray(self) -> Frame:
+        return grayscale(self.frame, dst=self._buffer("gray", self.frame.shape[:2]))
+
+    @cached_property
+    def square(self) -> Frame:
+        return make_square(self.gray)
+
+    def stretched(self, width: int, height: int) -> Frame:
+        product = FrameProduct("stretched", (width, height))
+        if (frame := self._products.get(product)) is None:
+            frame = cv2.resize(
+                self.gray,
+                (width, height),
+                dst=self._buffer(product, (height, width)),
+                interpolation=cv2.INTER_AREA,
+            )
+            self._products[product] = frame
+        return cast(Frame, frame)
+
+    def resized(self, side_length: int) -> Frame:
+        product = FrameProduct("resized", side_length)
+        if (frame := self._products.get(product)) is None:
+            frame = square_resize(self.square, side_length, dst=self._buffer(product, (side_length, side_length)))
+            self._products[product] = frame
+        return cast(Frame, frame)
+
+    def thresholded(self, side_length: int) -> Frame:
+        product = FrameProduct("thresholded", side_length)
+        if (frame := self._products.get(product)) is None:
+            frame = median_threshold(
+                self.resized(side_length), dst=self._buffer(product, (side_length, side_length))
+            )
+            self._products[product] = frame
+        return cast(Frame, frame)
+
+    def pyramid(self, side_length: int) -> list[Frame]:
+        """Pyramid levels ordered from the smallest (1x1) to the largest (`side_length`)."""
+        product = FrameProduct("pyramid", side_length)
+        if (levels := self._products.get(product)) is None:
+            levels = [self.resized(side_length)]
+            while (level_side_length := levels[-1].shape[0] // 2) > 0:
+                level_product = FrameProduct("pyramid", (side_length, level_side_length))
+                levels.append(
+                    square_resize(
+                        levels[-1],
+                        level_side_length,
+                        dst=self._buffer(level_product, (level_side_length, level_side_length)),
+                    )
+                )
+            levels.reverse()
+            self._products[product] = levels
+        return cast(list[Frame], levels)
+
+    def compute(self, product: FrameProduct) -> Frame | list[Frame]:
+        match product:
+            case FrameProduct("gray"):
+                return self.gray
+            case FrameProduct("square"):
+                return self.square
+            case FrameProduct("stretched", (int(width), int(height))):
+                return self.stretched(width, height)
+            case FrameProduct("resized", int(side_length)):
+                return self.resized(side_length)
+            case FrameProduct("thresholded", int(side_length)):
+                return self.thresholded(side_length)
+            case FrameProduct("pyramid", int(side_length)):
+                return self.pyramid(side_length)
+        raise ValueError(f"unknown frame product {product}")
+
+    def detached(self, products: Iterable[FrameProduct]) -> "PreprocessedFrame":
+        """
+        Copy of the frame with `products` computed, not backed by reused buffers
+
+        Safe to hand over to another thread, products it computes lazily
+        aren't written into the preprocessor's buffers either.
+        """
+        detached = PreprocessedFrame(self.frame)
+        detached.__dict__["gray"] = self.gray.copy()
+        for product in products:
+            if product.kind in ("gray", "square"):
+                continue
+            value = self.compute(product)
+            detached._products[product] = [level.copy() for level in value] if isinstance(value, list) else value.copy()
+        return detached
+
+    def _buffer(self, key: object, shape: tuple[int, ...]) -> Frame | None:
+        if self._preprocessor is None:
+            return None
+        return self._preprocessor.buffer(key, shape, self._buffer_slot)
+
+
+class Preprocessor:
+    """
+    Shared per-frame preprocessing stage
+
+    Wraps input frames into `PreprocessedFrame`s, eagerly computing the
+    products that consumers declared, and hands out output buffers which
+    are reused across frames (alternating between two sets, so the products
+    of the previous frame stay intact while the current one is processed).
+    """
+
+    def __init__(self, reuse_buffers: bool = True):
+        self._reuse_buffers = reuse_buffers
+        self._buffers: list[dict[object, npt.NDArray[np.uint8]]] = [{}, {}]
+        self._slot = 0
+
+    def process(self, frame: Frame, products: Iterable[FrameProduct] = ()) -> PreprocessedFrame:
+        self._slot ^= 1
+        preprocessed = PreprocessedFrame(frame, self if self._reuse_buffers else None, self._slot)
+        for product in products:
+            preprocessed.compute(product)
+        return preprocessed
+
+    def buffer(self, key: object, shape: tuple[int, ...], slot: int) -> Frame:
+        buffers = self._buffers[slot]
+        buffer = buffers.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            buffers[key] = buffer
+        return buffer
+
@@ -2,8 +2,6 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Iterator, cast
 
-from hilbertcurve.hilbertcurve import HilbertCurve as HilbertCurveImpl
-
 
 @dataclass
 class Curve(ABC):
@@ -69,7 +67,10 @@ class PeanoCurve(Curve):
 @dataclass
 class HilbertCurve(Curve):
     def __post_init__(self) -> None:
-        self._curve_impl = HilbertCurveImpl(p=self.order, n=2)
+        from hilbertcurve.hilbertcurve import HilbertCurve as HilbertCurveImpl
+
+        # the implementation doesn't support order 0 (a single point), which `generate` special-cases
+        self._curve_impl = HilbertCurveImpl(p=max(self.order, 1), n=2)
 
     @property
     def side_length(self) -> int:
@@ -0,0 +1,62 @@
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import itertools
+
+import numpy as np
+import numpy.typing as npt
+
+from owl.converters import BaseConverter
+from owl.converters.utils import Preprocessor
+from owl.types import Frame
+
+
+@dataclass
+class ConverterFanOut:
+    """
+    Feed every frame to several converters at once
+
+    Each frame is preprocessed once (computing products all converters
+    declared), then all converters are updated concurrently on a thread
+    pool. The heavy lifting happens in OpenCV and NumPy which release the
+    GIL, so threads are enough to keep multiple cores busy.
+    """
+
+    converters: Sequence[BaseConverter]
+    max_workers: int | None = None
+
+    _preprocessor: Preprocessor = field(default_factory=Preprocessor, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers or len(self.converters),
+            thread_name_prefix="fanout",
+        )
+        self._products = list(
+            dict.fromkeys(
+                itertools.chain.from_iterable(converter.required_products() for converter in self.converters)
+            )
+        )
+
+    @property
+    def channel_count(self) -> int:
+        return len(self.converters)
+
+    def update(self, frame: Frame) -> None:
+        preprocessed = self._preprocessor.process(frame, self._products)
+        futures = [self._executor.submit(converter.update, preprocessed) for converter in self.converters]
+        for future in futures:
+            future.result()
+
+    def get_samples(self, count: int) -> npt.NDArray[np.float32]:
+        """Samples of all converters, shaped `(count, channel_count)`."""
+        futures = [self._executor.submit(converter.get_samples, count) for converter in self.converters]
+        samples = np.empty((count, self.channel_count), dtype=np.float32)
+        for channel, future in enumerate(futures):
+            samples[:, channel] = future.result()
+        return samples
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        for converter in self.converters:
+            converter.close()
@@ -0,0 +1,202 @@
+"""
+Decoded-frame cache of videos
+
+Decoding (especially of high resolution videos) dominates offline runs,
+even though converters only look at small grayscale frames. A video is
+decoded once into raw `uint8` grayscale stacks at one or more reduced
+resolutions plus an array of frame timestamps, later runs (including
+parallel workers) memory-map them instead of decoding. A cache is rebuilt
+once its video changes (size or modification time).
+
+    python -m owl.frame_cache test_videos/*.mp4 --sizes 240 64
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import cast
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from arcparse import arcparser, option, positional
+import numpy as np
+import numpy.typing as npt
+
+from owl.frame_source import ArrayFrameSource, FrameSourceError
+from owl.logging import init_logging
+from owl.types import Frame
+
+
+logger = logging.getLogger("frame_cache")
+
+DEFAULT_DIRECTORY = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "owl" / "frames"
+METADATA = "metadata.json"
+TIMESTAMPS = "timestamps.npy"
+
+
+@arcparser
+class FrameCacheArgs:
+    videos: list[str] = positional(help="videos to decode")
+    # arcparse ignores defaults of list options, an empty list means the default
+    sizes: list[int] = option(help="shorter sides of the cached frames (default: 240)")
+
+
+def reduced_size(width: int, height: int, size: int) -> tuple[int, int]:
+    """Frame size with the shorter side scaled down to `size`, keeping the aspect ratio (never upscaled)."""
+    scale = min(size / min(width, height), 1)
+    return max(round(width * scale), 1), max(round(height * scale), 1)
+
+
+@dataclass(frozen=True)
+class FrameCache:
+    directory: Path
+    fps: float
+    frame_count: int
+    shapes: dict[int, tuple[int, int]]  # (height, width) of frames by requested size
+    source_signature: tuple[int, int]  # size and mtime of the video the cache was built from
+
+    @classmethod
+    def open(cls, video: Path, root: Path = DEFAULT_DIRECTORY) -> "FrameCache | None":
+        """Cache of `video`, `None` if there is none or the video changed since it was built."""
+        directory = cache_directory(video, root)
+        try:
+            metadata = json.loads((directory / METADATA).read_text())
+        except (OSError, ValueError):
+            return None
+
+        cache = cls(
+            directory=directory,
+            fps=metadata["fps"],
+            frame_count=metadata["frame_count"],
+            shapes={int(size): (height, width) for size, (height, width) in metadata["shapes"].items()},
+            source_signature=tuple(metadata["source_signature"]),  # type: ignore[arg-type]
+        )
+        if cache.source_signature != source_signature(video):
+            logger.info("%s changed, invalidating its frame cache", video)
+            return None
+        return cache
+
+    @classmethod
+    def open_or_build(cls, video: Path, sizes: Iterable[int], root: Path = DEFAULT_DIRECTORY) -> "FrameCache":
+        """Cache of `video` containing all `sizes`, (re)built if needed."""
+        sizes = set(sizes)
+        cache = cls.open(video, root)
+        if cache is not None and sizes.issubset(cache.shapes):
+            return cache
+
+        # rebuilding decodes the video anyway, keep the sizes cached so far
+        return build_frame_cache(video, sizes | set(cache.shapes if cache is not None else ()), root)
+
+    @property
+    def timestamps(self) -> npt.NDArray[np.float64]:
+        """Presentation time of each frame in seconds."""
+        return cast(npt.NDArray[np.float64], np.load(self.directory / TIMESTAMPS, mmap_mode="r"))
+
+    def frames(self, size: int) -> Frame:
+        """Memory-mapped `(frame, height, width)` stack of frames with the shorter side `size`."""
+        height, width = self.shapes[size]
+        return cast(
+            Frame,
+            np.memmap(self.directory / f"{size}.u8", dtype=np.uint8, mode="r", shape=(self.frame_count, height, width)),
+        )
+
+    def source(self, size: int, prefetch: int = 0) -> ArrayFrameSource:
+        return ArrayFrameSource(frames=self.frames(size), fps=self.fps, prefetch=prefetch)
+
+
+def source_signature(video: Path) -> tuple[int, int]:
+    stat = video.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def cache_directory(video: Path, root: Path = DEFAULT_DIRECTORY) -> Path:
+    return root / hashlib.sha256(str(video.resolve()).encode()).hexdigest()[:32]
+
+
+def build_frame_cache(video: Path, sizes: Iterable[int], root: Path = DEFAULT_DIRECTORY) -> FrameCache:
+    import cv2
+
+    sizes = sorted(set(sizes), reverse=True)
+    signature = source_signature(video)
+    capture = cv2.VideoCapture(str(video))
+    if not capture.isOpened():
+        raise FrameSourceError(f"failed to open cv2 capture {str(video)!r}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    logger.info("decoding %s into a frame cache of sizes %s", video, ", ".join(map(str, sizes)))
+    root.mkdir(parents=True, exist_ok=True)
+    # built next to its final location and renamed into place, concurrent builders don't see partial caches
+    partial = Path(tempfile.mkdtemp(dir=root, prefix=".partial-"))
+    try:
+        files = {size: open(partial / f"{size}.u8", "wb") for size in sizes}
+        shapes: dict[int, tuple[int, int]] = {}
+        timestamps: list[float] = []
+        try:
+            while True:
+                success, frame = capture.read()
+                if not success:
+                    break
+                timestamps.append(capture.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+
+                reduced = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                # downscale from the previous (larger) size, which is cheaper than from the full frame
+                for size in sizes:
+                    width, height = reduced_size(reduced.shape[1], reduced.shape[0], size)
+                    if (width, height) != (reduced.shape[1], reduced.shape[0]):
+                        reduced = cv2.resize(reduced, (width, height), interpolation=cv2.INTER_AREA)
+                    shapes[size] = (height, width)
+                    files[size].write(reduced.tobytes())
+        finally:
+            capture.release()
+            for file in files.values():
+                file.close()
+
+        if not timestamps:
+            raise FrameSourceError(f"no frames could be decoded from {video}")
+
+        np.save(partial / TIMESTAMPS, np.array(timestamps, dtype=np.float64))
+        metadata = {
+            "source": str(video.resolve()),
+            "source_signature": signature,
+            "fps": fps,
+            "frame_count": len(timestamps),
+            "shapes": {str(size): shape for size, shape in shapes.items()},
+        }
+        (partial / METADATA).write_text(json.dumps(metadata, indent=2))
+
+        directory = cache_directory(video, root)
+        shutil.rmtree(directory, ignore_errors=True)
+        try:
+            partial.rename(directory)
+        except OSError:
+            # another process finished building the same cache first
+            logger.debug("%s was built concurrently, using that one", directory)
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+
+    logger.info("cached %d frames of %s", len(timestamps), video)
+    cache = FrameCache.open(video, root)
+    if cache is None:
+        raise Exception(f"frame cache of {video} changed while it was built")
+    return cache
+
+
+def main() -> int:
+    init_logging(level=logging.INFO)
+    args = FrameCacheArgs.parse()
+
+    for video in args.videos:
+        try:
+            FrameCache.open_or_build(Path(video), args.sizes or [240])
+        except FrameSourceError as e:
+            logger.error(e)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
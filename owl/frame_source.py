@@ -0,0 +1,363 @@
+"""
+Sources of input frames
+
+All sources produce BGR or grayscale `uint8` frames and can decode ahead on
+a background thread (`prefetch` frames deep), so decode jitter of file
+inputs doesn't stall the converter. Live cameras should be read without
+prefetching, buffered frames only add latency.
+
+Inputs are selected by strings (see `instantiate_frame_source`):
+
+    :0                         camera with index 0
+    video.mp4                  video file (anything OpenCV decodes)
+    frames/                    directory of images, in name order
+    frames.npy                 stack of frames (memory-mapped)
+    stdin:640x480              raw 8-bit grayscale frames from stdin
+    synthetic:shapes:640x480   generated frames ("shapes", "noise" or "gradient")
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Literal, cast
+import logging
+import queue
+import sys
+import threading
+
+import numpy as np
+
+from owl.types import Frame
+
+
+if TYPE_CHECKING:
+    import cv2
+
+
+logger = logging.getLogger("frame_source")
+
+DEFAULT_FPS = 30.0
+# frames decoded ahead for non-live inputs
+DEFAULT_PREFETCH = 8
+IMAGE_SUFFIXES = (".bmp", ".jpeg", ".jpg", ".png", ".pgm", ".ppm", ".tif", ".tiff", ".webp")
+
+
+class FrameSourceError(Exception):
+    pass
+
+
+@dataclass(kw_only=True)
+class FrameSource(ABC):
+    fps: float = DEFAULT_FPS
+    prefetch: int = 0
+    # set once reading stopped because the source ended rather than failed, cameras never end
+    reached_end: bool = field(default=False, init=False)
+
+    _queue: "queue.Queue[Frame | None] | None" = field(default=None, init=False, repr=False)
+    _thread: threading.Thread | None = field(default=None, init=False, repr=False)
+    _stopped: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _exhausted: bool = field(default=False, init=False, repr=False)
+
+    def open(self) -> None:
+        """Open the source, raises `FrameSourceError` if it can't be read."""
+        if self._thread is not None:
+            raise Exception("frame source already open")
+
+        self._open()
+        self._exhausted = False
+        self.reached_end = False
+        if self.prefetch > 0:
+            self._queue = queue.Queue(maxsize=self.prefetch)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+
+    def read(self) -> Frame | None:
+        """Next frame, `None` once the source ended (or failed)."""
+        if self._exhausted:
+            return None
+
+        frame = self._queue.get() if self._queue is not None else self._read()
+        if frame is None:
+            self._exhausted = True
+        return frame
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            # unblock the prefetch thread waiting for free space
+            assert self._queue is not None
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.01)
+                except queue.Empty:
+                    pass
+            self._thread = None
+            self._queue = None
+        self._close()
+
+    @abstractmethod
+    def _open(self) -> None:
+        ...
+
+    @abstractmethod
+    def _read(self) -> Frame | None:
+        ...
+
+    def _close(self) -> None:
+        pass
+
+    def _prefetch_loop(self) -> None:
+        assert self._queue is not None
+        while not self._stopped.is_set():
+            try:
+                frame = self._read()
+            except Exception as e:
+                # end the stream, otherwise `read` would wait for the next frame forever
+                logger.error("reading failed: %s", e)
+                frame = None
+
+            while not self._stopped.is_set():
+                try:
+                    self._queue.put(frame, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if frame is None:
+                return
+
+
+@dataclass(kw_only=True)
+class OpenCVFrameSource(FrameSource):
+    """Camera (by index) or video file decoded by OpenCV, `fps` is taken from the capture if it reports any"""
+
+    target: int | str
+
+    _capture: "cv2.VideoCapture | None" = field(default=None, init=False, repr=False)
+
+    def _open(self) -> None:
+        import cv2
+
+        self._capture = cv2.VideoCapture(self.target)
+        if not self._capture.isOpened():
+            raise FrameSourceError(f"failed to open cv2 capture {self.target!r}")
+        self.fps = self._capture.get(cv2.CAP_PROP_FPS) or self.fps
+
+    def _read(self) -> Frame | None:
+        assert self._capture is not None
+        success, frame = self._capture.read()
+        if not success:
+            import cv2
+
+            # a failed read before the last frame is a decoding error, not the end of a video
+            frame_count = self._capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            self.reached_end = frame_count > 0 and self._capture.get(cv2.CAP_PROP_POS_FRAMES) >= frame_count
+            return None
+        return cast(Frame, frame)
+
+    def _close(self) -> None:
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+
+@dataclass(kw_only=True)
+class ImageDirectoryFrameSource(FrameSource):
+    """Images of a directory in name order"""
+
+    directory: Path
+
+    _paths: list[Path] = field(default_factory=list, init=False, repr=False)
+    _index: int = field(default=0, init=False, repr=False)
+
+    def _open(self) -> None:
+        self._paths = sorted(path for path in self.directory.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+        if not self._paths:
+            raise FrameSourceError(f"no images found in {self.directory}")
+        self._index = 0
+
+    def _read(self) -> Frame | None:
+        import cv2
+
+        if self._index >= len(self._paths):
+            self.reached_end = True
+            return None
+
+        path = self._paths[self._index]
+        self._index += 1
+        frame = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            logger.error("couldn't read image %s", path)
+            return None
+        if frame.dtype != np.uint8:
+            raise FrameSourceError(f"{path} is not an 8-bit image")
+        # drop alpha, converters take BGR or grayscale frames
+        return cast(Frame, frame[:, :, :3] if frame.ndim == 3 else frame)
+
+
+@dataclass(kw_only=True)
+class ArrayFrameSource(FrameSource):
+    """
+    Stack of frames in a `(frame, height, width[, 3])` `uint8` array
+
+    Use `from_file` for `.npy` files, which are memory-mapped rather than
+    loaded, so frames are only paged in (by the prefetch thread, if any)
+    when read.
+    """
+
+    frames: np.ndarray
+
+    _index: int = field(default=0, init=False, repr=False)
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs: float | int) -> "ArrayFrameSource":
+        try:
+            frames = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            raise FrameSourceError(f"couldn't load frames from {path}: {e}") from e
+        if frames.dtype != np.uint8 or frames.ndim not in (3, 4):
+            raise FrameSourceError(f"{path} isn't a stack of uint8 frames (got {frames.dtype} {frames.shape})")
+        return cls(frames=frames, **kwargs)  # type: ignore[arg-type]
+
+    def _open(self) -> None:
+        self._index = 0
+
+    def _read(self) -> Frame | None:
+        if self._index >= len(self.frames):
+            self.reached_end = True
+            return None
+
+        # copy, so memory-mapped pages are read here rather than by the converter
+        frame = np.array(self.frames[self._index])
+        self._index += 1
+        return cast(Frame, frame)
+
+
+@dataclass(kw_only=True)
+class RawStreamFrameSource(FrameSource):
+    """Raw 8-bit grayscale frames of a fixed size read back to back from a binary stream (stdin by default)"""
+
+    width: int
+    height: int
+    stream: BinaryIO = field(default_factory=lambda: sys.stdin.buffer)
+
+    def _open(self) -> None:
+        pass
+
+    def _read(self) -> Frame | None:
+        size = self.width * self.height
+        data = self.stream.read(size)
+        if len(data) < size:
+            if data:
+                logger.warning("dropping incomplete frame of %d bytes", len(data))
+            self.reached_end = not data
+            return None
+        return cast(Frame, np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width))
+
+
+SyntheticPattern = Literal["shapes", "noise", "gradient"]
+
+
+@dataclass(kw_only=True)
+class SyntheticFrameSource(FrameSource):
+    """
+    Deterministic generated frames, endless unless `frame_count` is given
+
+    - `shapes`: a bright square and a gray circle moving over black
+    - `noise`: uniform noise, seeded by `seed` and the frame index
+    - `gradient`: horizontal gradient scrolling sideways
+    """
+
+    pattern: SyntheticPattern = "shapes"
+    width: int = 640
+    height: int = 480
+    frame_count: int | None = None
+    seed: int = 0
+
+    _index: int = field(default=0, init=False, repr=False)
+
+    def _open(self) -> None:
+        self._index = 0
+
+    def _read(self) -> Frame | None:
+        if self.frame_count is not None and self._index >= self.frame_count:
+            self.reached_end = True
+            return None
+
+        frame = self.render(self._index)
+        self._index += 1
+        return frame
+
+    def render(self, index: int) -> Frame:
+        if self.pattern == "noise":
+            rng = np.random.default_rng((self.seed, index))
+            return cast(Frame, rng.integers(0, 256, (self.height, self.width, 3), dtype=np.uint8))
+
+        if self.pattern == "gradient":
+            row = ((np.arange(self.width) * 256 // self.width + 4 * index) % 256).astype(np.uint8)
+            return cast(Frame, np.repeat(np.broadcast_to(row, (self.height, self.width))[:, :, None], 3, axis=2))
+
+        import cv2
+
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        side = min(self.width, self.height) // 4
+        # one pass across the frame every 4 seconds, bouncing off the edges
+        phase = (index / (4 * self.fps)) % 2
+        position = phase if phase < 1 else 2 - phase
+        left = int(position * (self.width - side))
+        top = int(position * (self.height - side))
+        frame[top : top + side, left : left + side] = 255
+        center = (self.width - 1 - left - side // 2, top + side // 2)
+        cv2.circle(frame, center, side // 2, (128, 128, 128), thickness=-1)
+        return cast(Frame, frame)
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    width, _, height = size.partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise FrameSourceError(f'invalid frame size "{size}", expected "<width>x<height>"') from None
+
+
+def instantiate_frame_source(
+    input: str,
+    prefetch: int = DEFAULT_PREFETCH,
+    frame_cache: int | None = None,
+) -> FrameSource:
+    """
+    Frame source for an input string as documented in the module docstring
+
+    Cameras are never prefetched, a deeper buffer would only delay frames.
+    Video files are read from a decoded-frame cache (see `owl.frame_cache`)
+    of grayscale frames with the shorter side `frame_cache` if given.
+    """
+    if input.startswith(":"):
+        return OpenCVFrameSource(target=int(input[1:]))
+
+    if input.startswith("stdin:"):
+        width, height = parse_size(input.removeprefix("stdin:"))
+        return RawStreamFrameSource(width=width, height=height, prefetch=prefetch)
+
+    if input.startswith("synthetic:"):
+        pattern, _, size = input.removeprefix("synthetic:").partition(":")
+        if pattern not in ("shapes", "noise", "gradient"):
+            raise FrameSourceError(f'unknown synthetic pattern "{pattern}"')
+        width, height = parse_size(size) if size else (640, 480)
+        return SyntheticFrameSource(
+            pattern=cast(SyntheticPattern, pattern),
+            width=width,
+            height=height,
+            prefetch=prefetch,
+        )
+
+    path = Path(input)
+    if path.is_dir():
+        return ImageDirectoryFrameSource(directory=path, prefetch=prefetch)
+    if path.suffix == ".npy":
+        return ArrayFrameSource.from_file(path, prefetch=prefetch)
+    if frame_cache is not None and path.is_file():
+        from owl.frame_cache import FrameCache
+
+        return FrameCache.open_or_build(path, [frame_cache]).source(frame_cache, prefetch=prefetch)
+    return OpenCVFrameSource(target=input, prefetch=prefetch)
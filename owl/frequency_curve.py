@@ -2,8 +2,12 @@
 
 from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Self
 
+import numpy as np
+import numpy.typing as npt
+
 from owl.audio_scale import AudioScale
 from owl.curves import Curve
 
@@ -17,11 +21,49 @@ class FrequencyCurve:
     def side_length(self) -> int:
         return self.curve.side_length
 
+    @cached_property
+    def coordinates(self) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """
+        Curve points as `(xs, ys)` index arrays, in curve order.
+
+        Computed once, suitable for gathering all curve pixels with `frame[ys, xs]`.
+        """
+        points = np.fromiter(
+            (coord for point in self.curve.generate() for coord in point),
+            dtype=np.intp,
+            count=2 * self.side_length**2,
+        ).reshape(-1, 2)
+        return points[:, 0].copy(), points[:, 1].copy()
+
+    @cached_property
+    def frequency_array(self) -> npt.NDArray[np.float64]:
+        return np.asarray(self.frequencies, dtype=np.float64)
+
+    @cached_property
+    def index_grid(self) -> npt.NDArray[np.intp]:
+        """Curve index of each position, indexed as `index_grid[y, x]`."""
+        xs, ys = self.coordinates
+        grid = np.empty((self.side_length, self.side_length), dtype=np.intp)
+        grid[ys, xs] = np.arange(len(xs))
+        return grid
+
+    def get_frequencies(self, xs: npt.ArrayLike, ys: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """Vectorized `get_frequency`, positions have to lie on the curve."""
+        return self.frequency_array[self.index_grid[ys, xs]]
+
     def get_frequency(self, position: tuple[int, int]) -> float | None:
         if (ix := self.curve.index_of(position)) is not None:
             return self.frequencies[ix]
         return None
 
+    def with_frequencies(self, frequencies: Sequence[float]) -> Self:
+        """Same curve mapped to different frequencies, reusing already computed curve tables."""
+        frequency_curve = type(self)(curve=self.curve, frequencies=frequencies)
+        for name in ("coordinates", "index_grid"):
+            if name in self.__dict__:
+                frequency_curve.__dict__[name] = self.__dict__[name]
+        return frequency_curve
+
     def __iter__(self) -> Iterator[tuple[tuple[int, int], float]]:
         yield from zip(self.curve.generate(), self.frequencies)
 
@@ -1,10 +1,15 @@
-from dataclasses import dataclass
+from collections.abc import Collection
+from dataclasses import dataclass, fields
+from functools import cache, lru_cache
 from pathlib import Path
 
 from owl.audio_scale import AudioScale, MelScale
 from owl.converters import (
     BaseConverter,
+    ClusteringMode,
     CurveConverter,
+    FocusConverter,
+    HilbertSpreadConverter,
     ScanConverter,
     ShiftersConverter,
 )
@@ -14,6 +19,51 @@ from owl.soundgen import MultiSineGen
 from owl.types import Signal
 
 
+# parameters which can be changed on a live converter without rebuilding it
+LIVE_PARAMETERS = frozenset({
+    "audio_scale_class",
+    "lowest_frequency",
+    "highest_frequency",
+    "transient_duration",
+    "ms_per_frame",
+})
+
+
+@cache
+def _cached_curve(curve_class: type[Curve], order: int) -> Curve:
+    return curve_class(order=order)
+
+
+@lru_cache(maxsize=32)
+def _cached_frequencies(
+    audio_scale_class: type[AudioScale], lowest_frequency: float, highest_frequency: float, count: int
+) -> tuple[float, ...]:
+    return tuple(audio_scale_class(lowest_frequency, highest_frequency).get_range(count))
+
+
+@lru_cache(maxsize=32)
+def _cached_frequency_curve(
+    curve_class: type[Curve],
+    order: int,
+    audio_scale_class: type[AudioScale],
+    lowest_frequency: float,
+    highest_frequency: float,
+) -> FrequencyCurve:
+    curve = _cached_curve(curve_class, order)
+    frequencies = _cached_frequencies(audio_scale_class, lowest_frequency, highest_frequency, curve.side_length**2)
+
+    # share curve tables (which are expensive for high orders) between all frequency ranges
+    return _cached_frequency_curve_template(curve_class, order).with_frequencies(frequencies)
+
+
+@cache
+def _cached_frequency_curve_template(curve_class: type[Curve], order: int) -> FrequencyCurve:
+    curve = _cached_curve(curve_class, order)
+    frequency_curve = FrequencyCurve(curve, [0.0] * curve.side_length**2)
+    frequency_curve.coordinates
+    return frequency_curve
+
+
 @dataclass
 class ConverterModel:
     converter_class: type[BaseConverter] = CurveConverter
@@ -33,44 +83,114 @@ class ConverterModel:
 
     intensity_levels: int = 4
     point_count: int = 4
+    clustering: ClusteringMode = ClusteringMode.KMEANS
+
+    base_frequency: float = 440
+
+    # detail of the focus converter uses `curve_order`, the cursor isn't a parameter (see `ConverterViewModel`)
+    periphery_order: int = 1
+    roi_size: float = 0.25
 
     input_source: Path | int | None = None
     loop: bool = True
 
     def construct_converter(self) -> BaseConverter:
-        audio_scale = self.construct_audio_scale()
-
         if issubclass(self.converter_class, CurveConverter):
-            curve = self.construct_curve()
-            frequencies = audio_scale.get_range(curve.side_length**2)
-            return CurveConverter(
-                frequency_curve=FrequencyCurve(curve, frequencies),
-                sine_gen=MultiSineGen(frequencies),
-                transient_duration=self.transient_duration,
+            return self.construct_curve_converter(self.construct_frequency_curve())
+        elif issubclass(self.converter_class, FocusConverter):
+            periphery_converter = self.construct_curve_converter(
+                self.construct_frequency_curve(self.periphery_order)
+            )
+            return FocusConverter(
+                detail_converter=self.construct_curve_converter(self.construct_frequency_curve()),
+                periphery_converter=periphery_converter,
+                periphery_resolution=periphery_converter.frequency_curve.side_length,
+                roi_size=self.roi_size,
                 sample_rate=self.sample_rate,
             )
         elif issubclass(self.converter_class, ScanConverter):
             return self.converter_class(
                 strip_count=self.strip_count,
-                frequencies=audio_scale.get_range(self.freqs_per_strip),
+                frequencies=self.construct_frequencies(self.freqs_per_strip),
                 ms_per_frame=self.ms_per_frame,
                 sound_cue=self.sound_cue,
                 sample_rate=self.sample_rate,
             )
         elif issubclass(self.converter_class, ShiftersConverter):
-            curve = self.construct_curve()
             return ShiftersConverter(
-                frequency_curve=FrequencyCurve.from_scale(curve, audio_scale),
-                sine_gen=MultiSineGen.blank(count=self.point_count),
+                frequency_curve=self.construct_frequency_curve(),
+                sine_gen=MultiSineGen.blank(count=self.point_count, sample_rate=self.sample_rate),
                 intensity_levels=self.intensity_levels,
                 transient_duration=self.transient_duration,
+                clustering=self.clustering,
+                sample_rate=self.sample_rate,
+            )
+        elif issubclass(self.converter_class, HilbertSpreadConverter):
+            frequencies = HilbertSpreadConverter.generate_frequencies(self.base_frequency, self.curve_order)
+            return HilbertSpreadConverter(
+                sine_gen=MultiSineGen(frequencies, sample_rate=self.sample_rate),
+                base_frequency=self.base_frequency,
+                order=self.curve_order,
+                transient_duration=self.transient_duration,
                 sample_rate=self.sample_rate,
             )
         else:
             raise AssertionError("unreachable")
 
+    def render_params(self) -> dict[str, object]:
+        """Parameters the rendered audio depends on, i.e. everything but the input."""
+        return {
+            field.name: getattr(self, field.name)
+            for field in fields(self)
+            if field.name not in ("input_source", "loop")
+        }
+
+    def can_reconfigure(self, converter: BaseConverter, changed_parameters: Collection[str]) -> bool:
+        """Whether `reconfigure` can apply changes of `changed_parameters` to `converter`."""
+        return type(converter) is self.converter_class and LIVE_PARAMETERS.issuperset(changed_parameters)
+
+    def reconfigure(self, converter: BaseConverter) -> None:
+        """Apply non-structural parameters (see `LIVE_PARAMETERS`) to a live converter in place."""
+        if isinstance(converter, CurveConverter | ShiftersConverter):
+            converter.transient_duration = self.transient_duration
+            converter.set_frequency_curve(self.construct_frequency_curve())
+        elif isinstance(converter, ScanConverter):
+            converter.reconfigure(
+                frequencies=self.construct_frequencies(self.freqs_per_strip),
+                ms_per_frame=self.ms_per_frame,
+            )
+        elif isinstance(converter, HilbertSpreadConverter):
+            converter.transient_duration = self.transient_duration
+        elif isinstance(converter, FocusConverter):
+            assert isinstance(converter.detail_converter, CurveConverter)
+            assert isinstance(converter.periphery_converter, CurveConverter)
+            converter.detail_converter.transient_duration = self.transient_duration
+            converter.detail_converter.set_frequency_curve(self.construct_frequency_curve())
+            converter.periphery_converter.transient_duration = self.transient_duration
+            converter.periphery_converter.set_frequency_curve(self.construct_frequency_curve(self.periphery_order))
+
     def construct_curve(self) -> Curve:
-        return self.curve_class(order=self.curve_order)
+        return _cached_curve(self.curve_class, self.curve_order)
+
+    def construct_frequency_curve(self, order: int | None = None) -> FrequencyCurve:
+        return _cached_frequency_curve(
+            self.curve_class,
+            self.curve_order if order is None else order,
+            self.audio_scale_class,
+            self.lowest_frequency,
+            self.highest_frequency,
+        )
+
+    def construct_curve_converter(self, frequency_curve: FrequencyCurve) -> CurveConverter:
+        return CurveConverter(
+            frequency_curve=frequency_curve,
+            sine_gen=MultiSineGen(frequency_curve.frequencies, sample_rate=self.sample_rate),
+            transient_duration=self.transient_duration,
+            sample_rate=self.sample_rate,
+        )
+
+    def construct_frequencies(self, count: int) -> list[float]:
+        return list(_cached_frequencies(self.audio_scale_class, self.lowest_frequency, self.highest_frequency, count))
 
     def construct_audio_scale(self) -> AudioScale:
         return self.audio_scale_class(self.lowest_frequency, self.highest_frequency)
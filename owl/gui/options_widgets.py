@@ -17,9 +17,14 @@ from PyQt6.QtWidgets import (
 from owl.audio_scale import BarkScale, MelScale
 from owl.converters import (
     CircularScanConverter,
+    ClusteringMode,
     CurveConverter,
+    FocusConverter,
+    HilbertSpreadConverter,
     HorizontalScanConverter,
+    RadialScanConverter,
     ShiftersConverter,
+    SpiralScanConverter,
     VerticalScanConverter,
 )
 from owl.curves import HilbertCurve, PeanoCurve
@@ -184,10 +189,14 @@ class ScanConverterOptions(OptionsWidget):
         self._scan_type.addItem("vertical")
         self._scan_type.addItem("horizontal")
         self._scan_type.addItem("circular")
+        self._scan_type.addItem("spiral")
+        self._scan_type.addItem("radial")
         scan_converters = [
             VerticalScanConverter,
             HorizontalScanConverter,
             CircularScanConverter,
+            SpiralScanConverter,
+            RadialScanConverter,
         ]
         self._scan_type.currentIndexChanged.connect(
             lambda ix: self._view_model.converter_class_updated.emit(
@@ -255,6 +264,15 @@ class ShiftersConverterOptions(OptionsWidget):
         )
         self.add_option("point count", self._point_count)
 
+        self._clustering = QComboBox()
+        clustering_modes = list(ClusteringMode)
+        for mode in clustering_modes:
+            self._clustering.addItem(mode.value)
+        self._clustering.currentIndexChanged.connect(
+            lambda ix: self._view_model.clustering_updated.emit(clustering_modes[ix])
+        )
+        self.add_option("clustering", self._clustering)
+
         # curve args
         self._curve_class = QComboBox()
         self._curve_class.addItem("hilbert")
@@ -272,3 +290,90 @@ class ShiftersConverterOptions(OptionsWidget):
             lambda value: self._view_model.curve_order_updated.emit(value),
         )
         self.add_option("curve order", self._curve_order)
+
+
+class SpreadConverterOptions(OptionsWidget):
+    selected = pyqtSignal(name="selected")
+
+    def __init__(self, view_model: ConverterViewModel):
+        super().__init__()
+        self._view_model = view_model
+
+        self.selected.connect(
+            lambda: self._view_model.converter_class_updated.emit(HilbertSpreadConverter)
+        )
+
+        self._base_frequency = QLineEdit(str(view_model.model.base_frequency))
+        on_valid_float_input(
+            self._base_frequency,
+            lambda value: self._view_model.base_frequency_updated.emit(value),
+        )
+        self.add_option("base frequency", self._base_frequency)
+
+        self._curve_order = QLineEdit(str(view_model.model.curve_order))
+        on_valid_int_input(
+            self._curve_order,
+            lambda value: self._view_model.curve_order_updated.emit(value),
+            min=1,
+        )
+        self.add_option("levels", self._curve_order)
+
+        self._transient_duration = QLineEdit(str(view_model.model.transient_duration))
+        on_valid_float_input(
+            self._transient_duration,
+            lambda value: self._view_model.transient_duration_updated.emit(value),
+        )
+        self.add_option("transient duration", self._transient_duration)
+
+
+class FocusConverterOptions(OptionsWidget):
+    selected = pyqtSignal(name="selected")
+
+    def __init__(self, view_model: ConverterViewModel):
+        super().__init__()
+        self._view_model = view_model
+
+        self.selected.connect(
+            lambda: self._view_model.converter_class_updated.emit(FocusConverter)
+        )
+
+        # curve args
+        self._curve_class = QComboBox()
+        self._curve_class.addItem("hilbert")
+        self._curve_class.addItem("peano")
+        self._curve_class.currentIndexChanged.connect(
+            lambda ix: self._view_model.curve_class_updated.emit(
+                HilbertCurve if ix == 0 else PeanoCurve
+            )
+        )
+        self.add_option("curve type", self._curve_class)
+
+        self._curve_order = QLineEdit(str(view_model.model.curve_order))
+        on_valid_int_input(
+            self._curve_order,
+            lambda value: self._view_model.curve_order_updated.emit(value),
+            min=1,
+        )
+        self.add_option("detail order", self._curve_order)
+
+        self._periphery_order = QLineEdit(str(view_model.model.periphery_order))
+        on_valid_int_input(
+            self._periphery_order,
+            lambda value: self._view_model.periphery_order_updated.emit(value),
+            min=1,
+        )
+        self.add_option("periphery order", self._periphery_order)
+
+        self._roi_size = QLineEdit(str(view_model.model.roi_size))
+        on_valid_float_input(
+            self._roi_size,
+            lambda value: self._view_model.roi_size_updated.emit(value),
+        )
+        self.add_option("focus size", self._roi_size)
+
+        self._transient_duration = QLineEdit(str(view_model.model.transient_duration))
+        on_valid_float_input(
+            self._transient_duration,
+            lambda value: self._view_model.transient_duration_updated.emit(value),
+        )
+        self.add_option("transient duration", self._transient_duration)
@@ -1,16 +1,35 @@
+from collections.abc import Callable
 from pathlib import Path
-from typing import Any, cast
+from queue import SimpleQueue
+from typing import Any
+import copy
 import logging
+import tempfile
 import threading
 import time
 
-from PyQt6.QtCore import QObject, pyqtBoundSignal, pyqtSignal
-import cv2
+from PyQt6.QtCore import QObject, QTimer, pyqtBoundSignal, pyqtSignal
+import numpy as np
 
-from owl.converters import BaseConverter
+from owl.converters import BaseConverter, BaseFocusConverter
+from owl.frame_source import FrameSource, FrameSourceError, instantiate_frame_source
 from owl.gui.models import ConverterModel
-from owl.output_stream import LiveAudioOutputStream
-from owl.types import Frame
+from owl.output_stream import FileAudioOutputStream, LiveAudioOutputStream
+from owl.render_cache import RenderCache, read_wav
+from owl.sample_queue import SampleQueue
+from owl.spectrogram import Spectrogram
+from owl.stats import PipelineStats
+from owl.types import Frame, Signal
+
+
+logger = logging.getLogger("view_models")
+
+# coalesce option edits (e.g. typing a multi-digit number) into a single reconfiguration
+RECONFIGURE_DELAY_MS = 250
+# crossfade from the old to the new converter when it has to be rebuilt
+CROSSFADE_DURATION = 0.05
+# the spectrogram worker skips audio it couldn't keep up with rather than lagging behind
+SPECTROGRAM_MAX_BACKLOG = 0.5
 
 
 class ConverterViewModel(QObject):
@@ -33,6 +52,12 @@ class ConverterViewModel(QObject):
 
     intensity_levels_updated = pyqtSignal(int, name="intensity_levels_updated")
     point_count_updated = pyqtSignal(int, name="point_count_updated")
+    clustering_updated = pyqtSignal(object, name="clustering_updated")
+
+    base_frequency_updated = pyqtSignal(float, name="base_frequency_updated")
+
+    periphery_order_updated = pyqtSignal(int, name="periphery_order_updated")
+    roi_size_updated = pyqtSignal(float, name="roi_size_updated")
 
     converter_updated = pyqtSignal(BaseConverter, name="converter_updated")
     new_cam_frame = pyqtSignal(object, name="new_cam_frame")
@@ -41,8 +66,22 @@ class ConverterViewModel(QObject):
     def __init__(self, model: ConverterModel):
         super().__init__()
         self._model = model
+        self._source: FrameSource | None = None
+        # point of attention of focus converters, kept across converter rebuilds
+        self._cursor_position = (0.5, 0.5)
+
+        # converter is only touched from the converter thread, other threads queue tasks for it
+        self._converter_tasks: SimpleQueue[Callable[[], None]] = SimpleQueue()
+        self._fading_converter: BaseConverter | None = None
+        self._crossfade_length = 0
+        self._crossfade_position = 0
         self._set_converter(model.construct_converter())
-        self._capture = None
+
+        self._changed_parameters: set[str] = set()
+        self._reconfigure_timer = QTimer(self)
+        self._reconfigure_timer.setSingleShot(True)
+        self._reconfigure_timer.setInterval(RECONFIGURE_DELAY_MS)
+        self._reconfigure_timer.timeout.connect(self._apply_changed_parameters)
 
         for name in vars(self.__class__):
             if not name.endswith("_updated") or name == "converter_updated":
@@ -56,12 +95,25 @@ class ConverterViewModel(QObject):
 
             def update_value(name: str, value: Any) -> None:
                 setattr(self._model, name, value)
-                self.converter_updated.emit(self._model.construct_converter())
+                self._changed_parameters.add(name)
+                self._reconfigure_timer.start()
 
             signal.connect(lambda value, name=name: update_value(name, value))
 
         self.converter_updated.connect(self._set_converter)
 
+        self.stats = PipelineStats()
+
+        # renders of whole files played without changing parameters are cached and replayed without converting
+        self._render_cache = RenderCache()
+        self._render_invalidated = False
+
+        # played audio is copied into `_monitor` and transformed on a separate thread
+        self._monitor = SampleQueue()
+        self.spectrogram = Spectrogram(sample_rate=model.sample_rate)
+        self._spectrogram_thread = threading.Thread(target=self._spectrogram_loop, daemon=True)
+        self._spectrogram_thread.start()
+
         self._converter_thread = threading.Thread(
             target=self._converter_loop, daemon=True
         )
@@ -73,37 +125,96 @@ class ConverterViewModel(QObject):
 
     def set_input_source(self, input_source: Path | int | None) -> None:
         self._model.input_source = input_source
+        self._render_invalidated = True
+
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+        if input_source is None:
+            return
+
+        try:
+            source = instantiate_frame_source(f":{input_source}" if isinstance(input_source, int) else str(input_source))
+            source.open()
+        except FrameSourceError as e:
+            logger.error(e)
+            return
+        self._source = source
+
+    def set_cursor_position(self, position: tuple[float, float]) -> None:
+        """Move the point of attention of focus converters, `(0, 0)` being the top-left corner of the frame."""
+        self._cursor_position = position
+        self._converter_tasks.put(lambda: self._move_cursor(self._converter))
+
+    def _move_cursor(self, converter: BaseConverter) -> None:
+        if isinstance(converter, BaseFocusConverter):
+            converter.on_cursor_move(self._cursor_position)
+
+    def _apply_changed_parameters(self) -> None:
+        changed_parameters = self._changed_parameters
+        self._changed_parameters = set()
+        self._render_invalidated = True
+
+        # the decision is made against the latest requested converter, which may not be swapped in yet
+        converter = self._requested_converter
+        if self._model.can_reconfigure(converter, changed_parameters):
+            # the task runs on the converter thread, don't let it see parameters changed after this point
+            model = copy.copy(self._model)
+            self._converter_tasks.put(lambda: model.reconfigure(converter))
+        else:
+            self.converter_updated.emit(self._model.construct_converter())
 
-        if self._capture is not None:
-            self._capture.release()
+    def _run_converter_tasks(self) -> None:
+        while not self._converter_tasks.empty():
+            self._converter_tasks.get()()
 
-        if isinstance(input_source, int):
-            self._capture = cv2.VideoCapture(input_source)
-        elif isinstance(input_source, Path):
-            self._capture = cv2.VideoCapture(str(input_source))
-        else:
-            self._capture = None
+    def _get_samples(self, count: int) -> Signal:
+        """Get converter samples, crossfading from the previous converter after a swap."""
+        samples = self._converter.get_samples(count)
+        if self._fading_converter is None:
+            return samples
+
+        fade_count = min(count, self._crossfade_length - self._crossfade_position)
+        ramp = np.arange(self._crossfade_position, self._crossfade_position + fade_count) / self._crossfade_length
+        samples = np.array(samples, dtype=np.float32)
+        samples[:fade_count] = samples[:fade_count] * ramp + self._fading_converter.get_samples(fade_count) * (1 - ramp)
+
+        self._crossfade_position += fade_count
+        if self._crossfade_position >= self._crossfade_length:
+            self._fading_converter.close()
+            self._fading_converter = None
+        return samples
 
     def _converter_loop(self) -> None:
-        output_stream = LiveAudioOutputStream(sample_rate=self._model.sample_rate)
+        output_stream = LiveAudioOutputStream(sample_rate=self._model.sample_rate, monitor=self._monitor)
         while True:
-            # do nothing if capture is not open
-            if self._capture is None or not self._capture.isOpened():
+            self._run_converter_tasks()
+
+            # do nothing if no source is open
+            if self._source is None:
                 time.sleep(0.2)
                 continue
 
+            # reset before the parameters are read, hashing the input may take a while and any change
+            # made meanwhile has to invalidate the recording
+            self._render_invalidated = False
+            source = self._source
+            render_key, cached_render = self._cached_render()
+            recording: list[Signal] = []
+            cached_position = 0
+
             output_stream.open()
 
             frame: Frame | None = None
             capture_closed = False
-            fps = self._capture.get(cv2.CAP_PROP_FPS)
-            delta = 1000 / fps
+            delta = 1000 / self._source.fps
 
             def capture_reader() -> None:
                 """
                 Keep setting successfully-read frames to the `frame` variable.
                 """
-                assert self._capture is not None
+                assert self._source is not None
                 nonlocal frame, capture_closed
                 last_frame = time.time() * 1000
                 while True:
@@ -111,13 +222,14 @@ class ConverterViewModel(QObject):
                     while 1000 * time.time() - last_frame < delta:
                         time.sleep(0.01)
 
-                    success, new_frame = self._capture.read()
-                    if not success:
+                    with self.stats.span("read"):
+                        new_frame = self._source.read()
+                    if new_frame is None:
                         logging.error("couldn't read from capture")
                         capture_closed = True
                         break
 
-                    frame = cast(Frame, new_frame)
+                    frame = new_frame
                     last_frame += delta
 
             try:
@@ -135,24 +247,90 @@ class ConverterViewModel(QObject):
                     while 1000 * time.time() - last_frame < delta:
                         time.sleep(0.01)
 
-                    self._converter.update(frame)
-                    audio_samples = self._converter.get_samples(samples_per_frame)
-                    output_stream.write(audio_samples)
+                    self._run_converter_tasks()
+                    if cached_render is not None and not self._render_invalidated:
+                        audio_samples = cached_render[cached_position : cached_position + samples_per_frame]
+                        audio_samples = np.pad(audio_samples, (0, samples_per_frame - len(audio_samples)))
+                        cached_position += samples_per_frame
+                        self.new_cam_frame.emit(frame)
+                    else:
+                        with self.stats.span("preprocess"):
+                            preprocessed = self._converter.preprocess(frame)
+                        with self.stats.span("update"):
+                            self._converter.update(preprocessed)
+                        with self.stats.span("get_samples"):
+                            audio_samples = self._get_samples(samples_per_frame)
+                    with self.stats.span("write"):
+                        output_stream.write(audio_samples)
+                    if render_key is not None and cached_render is None:
+                        recording.append(audio_samples)
                     last_frame += delta
+
+                # renders cut short by a read error are incomplete, don't cache them
+                completed = source.reached_end and source is self._source
+                if render_key is not None and cached_render is None and completed and not self._render_invalidated:
+                    self._store_render(render_key, recording)
             finally:
                 output_stream.close()
                 if self._model.loop:
                     self.set_input_source(self._model.input_source)
-                else:
-                    self._capture.release()
-                    self._capture = None
+                elif self._source is not None:
+                    self._source.close()
+                    self._source = None
+
+    def _cached_render(self) -> tuple[str | None, Signal | None]:
+        """Render cache key of a file input (`None` for cameras) and its cached render, if any."""
+        input_source = self._model.input_source
+        if not isinstance(input_source, Path) or not input_source.is_file():
+            return None, None
+        # the audio depends on where the cursor was moved during playback
+        if issubclass(self._model.converter_class, BaseFocusConverter):
+            return None, None
+
+        key = self._render_cache.key(input_source, self._model.render_params())
+        path = self._render_cache.get(key)
+        return key, read_wav(path) if path is not None else None
+
+    def _store_render(self, key: str, recording: list[Signal]) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "render.wav"
+            output_stream = FileAudioOutputStream(filename=str(path), sample_rate=self._model.sample_rate)
+            output_stream.open()
+            output_stream.write(np.concatenate(recording))
+            output_stream.close()
+            self._render_cache.put(key, path)
 
-    def _set_converter(self, converter: BaseConverter) -> None:
-        self._converter = converter
+    def _spectrogram_loop(self) -> None:
+        hop_duration = self.spectrogram.hop_size / self._model.sample_rate
+        max_backlog = int(SPECTROGRAM_MAX_BACKLOG * self._model.sample_rate)
+        while True:
+            time.sleep(hop_duration)
+
+            if (backlog := len(self._monitor) - max_backlog) > 0:
+                self._monitor.pop(backlog)
+            if len(self._monitor) > 0:
+                self.spectrogram.push(self._monitor.pop(len(self._monitor)))
 
-        self._converter.on(
+    def _set_converter(self, converter: BaseConverter) -> None:
+        converter.on(
             "new-input-frame", lambda frame: self.new_cam_frame.emit(frame)
         )
-        self._converter.on(
+        converter.on(
             "new-converter-frame", lambda frame: self.new_converter_frame.emit(frame)
         )
+
+        self._move_cursor(converter)
+        self._requested_converter = converter
+        if not hasattr(self, "_converter"):
+            self._converter = converter
+        else:
+            self._converter_tasks.put(lambda: self._swap_converter(converter))
+
+    def _swap_converter(self, converter: BaseConverter) -> None:
+        if self._fading_converter is not None:
+            self._fading_converter.close()
+
+        self._fading_converter = self._converter
+        self._crossfade_length = max(int(CROSSFADE_DURATION * converter.sample_rate), 1)
+        self._crossfade_position = 0
+        self._converter = converter
@@ -1,6 +1,6 @@
-import itertools
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QImage, QPixmap, QResizeEvent
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QFontDatabase, QImage, QMouseEvent, QPixmap, QResizeEvent
 from PyQt6.QtWidgets import (
     QComboBox,
     QFrame,
@@ -10,18 +10,46 @@ from PyQt6.QtWidgets import (
     QStackedWidget,
     QVBoxLayout,
 )
+import numpy as np
 
+from owl.spectrogram import Spectrogram
+from owl.stats import PipelineStats
 from owl.types import Frame
 
 from .options_widgets import (
     CommonConverterOptions,
     CurveConverterOptions,
+    FocusConverterOptions,
     ScanConverterOptions,
     ShiftersConverterOptions,
+    SpreadConverterOptions,
 )
 from .view_models import ConverterViewModel
 
 
+SPECTROGRAM_FPS = 30
+STATS_REFRESH_MS = 500
+
+
+def frame_to_pixmap(frame: Frame) -> QPixmap:
+    """Convert a grayscale or BGR frame without copying it into an intermediate buffer."""
+    if frame.ndim == 2:
+        image_format, pixel_strides = QImage.Format.Format_Grayscale8, (1,)
+    elif frame.ndim == 3 and frame.shape[2] == 3:
+        image_format, pixel_strides = QImage.Format.Format_BGR888, (3, 1)
+    else:
+        raise Exception(f"unsupported frame shape {frame.shape}")
+
+    # rows may be padded (e.g. a crop), but pixels within a row have to be packed
+    if frame.dtype != np.uint8 or frame.strides[1:] != pixel_strides:
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+
+    # QImage doesn't own the data, `frame` stays referenced until `fromImage` copies it into the pixmap
+    height, width = frame.shape[:2]
+    image = QImage(sip.voidptr(frame.ctypes.data), width, height, frame.strides[0], image_format)
+    return QPixmap.fromImage(image)
+
+
 class SidePanel(QFrame):
     def __init__(self, view_model: ConverterViewModel):
         super().__init__()
@@ -33,6 +61,8 @@ class SidePanel(QFrame):
             ("curve", CurveConverterOptions(view_model)),
             ("scan", ScanConverterOptions(view_model)),
             ("shifters", ShiftersConverterOptions(view_model)),
+            ("spread", SpreadConverterOptions(view_model)),
+            ("focus", FocusConverterOptions(view_model)),
         ]
 
         # initialize common converter options
@@ -62,48 +92,100 @@ class SidePanel(QFrame):
         layout.addWidget(self._converter_select)
         layout.addWidget(self._converter_specific_options_stack)
         layout.addStretch()
+        layout.addWidget(StatsPanel(view_model.stats))
         self.setLayout(layout)
 
 
+class StatsPanel(QLabel):
+    """Pipeline stage timings in milliseconds, refreshed periodically."""
+
+    def __init__(self, stats: PipelineStats, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = stats
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(STATS_REFRESH_MS)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start()
+        self._refresh()
+
+    def _refresh(self) -> None:
+        lines = [f"{'ms':12}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}"]
+        for stage, s in self._stats.summary().items():
+            lines.append(f"{stage:12}{s.p50_ms:7.2f}{s.p95_ms:7.2f}{s.p99_ms:7.2f}{s.max_ms:7.2f}")
+        self.setText("\n".join(lines))
+
+
 class MaxContentPixmapLabel(QLabel):
+    # mouse position over the shown pixmap, normalized to (0, 0) top-left and (1, 1) bottom-right
+    cursor_moved = pyqtSignal(object, name="cursor_moved")
+
     def __init__(self, pixmap: QPixmap, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._pixmap = pixmap
         self.setPixmap(pixmap)
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setMouseTracking(True)
 
     def setPixmap(self, a0: QPixmap) -> None:
-        new_pixmap = a0.scaled(
-            self.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.FastTransformation,
-        )
-        super().setPixmap(new_pixmap)
+        self._pixmap = a0
+        self._show_scaled(Qt.TransformationMode.FastTransformation)
 
     def resizeEvent(self, a0: QResizeEvent | None) -> None:
-        new_pixmap = self._pixmap.scaled(
-            self.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation,
-        )
-        self.setPixmap(new_pixmap)
+        if a0 is None or a0.size() != a0.oldSize():
+            self._show_scaled(Qt.TransformationMode.SmoothTransformation)
         return super().resizeEvent(a0)
 
     def update_from_frame(self, frame: Frame) -> None:
-        height, width = frame.shape
-        image = QImage(self.fix_row_alignment(frame.tobytes(), width), width, height, QImage.Format.Format_Grayscale8)
-        self._pixmap = QPixmap.fromImage(image)
-        self.setPixmap(self._pixmap)
-
-    @staticmethod
-    def fix_row_alignment(data: bytes, width: int) -> bytes:
-        """
-        Align row length to 4.
-
-        QImage (with Format_Grayscale8) expects rows to always by 4-byte aligned.
-        """
-        fix = b"\x00" * ((4 - width) % 4)
-        return b"".join(map(lambda x: bytes(x) + fix, itertools.batched(data, width)))
+        self.setPixmap(frame_to_pixmap(frame))
+
+    def mouseMoveEvent(self, ev: QMouseEvent | None) -> None:
+        shown = self.pixmap()
+        if ev is not None and not shown.isNull():
+            # the scaled pixmap is centered in the label
+            left = (self.width() - shown.width()) / 2
+            top = (self.height() - shown.height()) / 2
+            x = (ev.position().x() - left) / shown.width()
+            y = (ev.position().y() - top) / shown.height()
+            if 0 <= x <= 1 and 0 <= y <= 1:
+                self.cursor_moved.emit((x, y))
+        super().mouseMoveEvent(ev)
+
+    def _show_scaled(self, transformation: Qt.TransformationMode) -> None:
+        # `QPixmap.scaled` always copies, skip it if the pixmap already fits the label
+        size = self._pixmap.size().scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        if size == self._pixmap.size():
+            super().setPixmap(self._pixmap)
+            return
+
+        super().setPixmap(self._pixmap.scaled(size, Qt.AspectRatioMode.IgnoreAspectRatio, transformation))
+
+
+class SpectrogramView(QLabel):
+    """Blit the latest spectrogram columns at display rate, stretched to the label."""
+
+    def __init__(self, spectrogram: Spectrogram, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._spectrogram = spectrogram
+        self._shown_version = -1
+        self.setScaledContents(True)
+        self.setMinimumSize(1, 1)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000 // SPECTROGRAM_FPS)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start()
+        self._refresh()
+
+    def _refresh(self) -> None:
+        if self._spectrogram.version == self._shown_version:
+            return
+
+        with self._spectrogram.lock:
+            self._shown_version = self._spectrogram.version
+            pixmap = frame_to_pixmap(self._spectrogram.image)
+        self.setPixmap(pixmap)
 
 
 class MainGrid(QFrame):
@@ -122,12 +204,11 @@ class MainGrid(QFrame):
         input_layout.addWidget(cam_view)
         input_layout.addWidget(converter_view)
         view_model.new_cam_frame.connect(cam_view.update_from_frame)
+        # steers focus converters' point of attention
+        cam_view.cursor_moved.connect(view_model.set_cursor_position)
         view_model.new_converter_frame.connect(converter_view.update_from_frame)
 
-        spectrogram = QLabel()
-        spectrogram.setPixmap(cam_pixmap)
-        spectrogram.setScaledContents(True)
-        output_layout.addWidget(spectrogram)
+        output_layout.addWidget(SpectrogramView(view_model.spectrogram))
 
         self.setLayout(layout)
 
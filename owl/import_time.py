@@ -0,0 +1,99 @@
+"""
+Import-time regression check for the command-line entry points
+
+Imports each entry point in a fresh interpreter with `python -X importtime`
+and fails if it exceeds the time budget or pulls in a heavy dependency
+which should only be loaded once actually needed.
+
+    python -m owl.import_time [--budget-ms 150] [--runs 5]
+"""
+
+from dataclasses import dataclass
+import logging
+import subprocess
+import sys
+
+from arcparse import arcparser, option
+
+from owl.logging import init_logging
+
+
+logger = logging.getLogger("owl.import_time")
+
+ENTRY_POINTS = ("owl.__main__", "owl.compare", "owl.multi")
+
+# modules the entry points may only import once arguments are parsed
+HEAVY_MODULES = ("cv2", "numpy", "pyaudio", "pyee", "hilbertcurve", "PyQt6")
+
+
+@arcparser
+class ImportTimeArgs:
+    budget_ms: float = option(default=150, help="maximum import time of a single entry point (default: 150)")
+    runs: int = option(default=5, help="imports per entry point, the fastest one is reported (default: 5)")
+
+
+@dataclass
+class ImportProfile:
+    module: str
+    total_us: int
+    modules: dict[str, int]  # cumulative import time of every imported module
+
+    @property
+    def heavy_modules(self) -> list[str]:
+        return [module for module in HEAVY_MODULES if module in self.modules]
+
+
+def profile_import(module: str) -> ImportProfile:
+    """Import `module` in a fresh interpreter and parse its `-X importtime` report."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules: dict[str, int] = {}
+    total_us = 0
+    for line in process.stderr.splitlines():
+        # import time:       330 |      32891 | arcparse
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        modules[name.strip()] = int(cumulative)
+
+        # top-level entries are the module and its parent packages, everything else is nested in them
+        is_top_level = not name.removeprefix(" ").startswith(" ")
+        if is_top_level and f"{module}.".startswith(f"{name.strip()}."):
+            total_us += int(cumulative)
+
+    return ImportProfile(module=module, total_us=total_us, modules=modules)
+
+
+def main() -> int:
+    init_logging(level=logging.INFO)
+    args = ImportTimeArgs.parse()
+
+    failed = False
+    for entry_point in ENTRY_POINTS:
+        profile = min((profile_import(entry_point) for _ in range(args.runs)), key=lambda p: p.total_us)
+        logger.info(f"{entry_point}: {profile.total_us / 1000:.1f}ms")
+
+        if profile.heavy_modules:
+            logger.error(f"{entry_point} eagerly imports {', '.join(profile.heavy_modules)}")
+            failed = True
+        if profile.total_us / 1000 > args.budget_ms:
+            dependencies = {
+                name: us for name, us in profile.modules.items() if not f"{entry_point}.".startswith(f"{name}.")
+            }
+            slowest = sorted(dependencies.items(), key=lambda item: item[1], reverse=True)[:5]
+            logger.error(
+                f"{entry_point} exceeds the {args.budget_ms:.0f}ms budget, slowest: "
+                + ", ".join(f"{name} ({us / 1000:.1f}ms)" for name, us in slowest)
+            )
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
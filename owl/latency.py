@@ -0,0 +1,214 @@
+"""
+Motion-to-sound latency of converters
+
+Synthetic frames with a bright square repeatedly appearing on a black
+background are fed through the regular source -> converter -> output loop
+in real time into a loopback sink emulating an audio device. Latency is
+the time between the source returning the frame the square appeared in
+and the sound being heard. Only appearances are measured, fading out of
+pulsing (scanning) converters has no well-defined end.
+
+    owl-latency "curve hilbert --order 2" "scan horizontal -c8 -n8 --ms-per-frame 250" --chunk-sizes 256 1024
+"""
+
+from dataclasses import asdict, dataclass, field
+import json
+import logging
+import shlex
+import time
+
+from arcparse import arcparser, option, positional
+import numpy as np
+
+from owl.__main__ import Args, instantiate_converter, main_loop
+from owl.frame_source import FrameSource
+from owl.logging import init_logging
+from owl.output_stream import LoopbackAudioOutputStream
+from owl.stats import PipelineStats
+from owl.types import Frame
+
+
+logger = logging.getLogger("owl.latency")
+
+# audio envelope resolution, bounds the measurement precision
+ENVELOPE_BLOCK_DURATION = 0.002
+# relative loudness change of a step to be measurable
+MIN_LEVEL_CHANGE = 0.25
+
+
+@arcparser
+class LatencyArgs:
+    converters: list[str] = positional(
+        help='converter arguments as passed to `owl`, one quoted string per converter (e.g. "curve hilbert --order 2")',
+    )
+    # arcparse ignores defaults of list options, an empty list means the default
+    chunk_sizes: list[int] = option(help="output buffer sizes to measure with (default: 1024)")
+    steps: int = option(default=10, help="number of square appearances per measurement (default: 10)")
+    step_frames: int = option(
+        default=30,
+        help="frames the square is shown and hidden for, has to exceed the latency (default: 30)",
+    )
+    fps: float = option(default=30)
+    size: int = option(default=240, help="side of the synthetic frames (default: 240)")
+    sample_rate: int = option(default=48000)
+    json: str | None = option(help="write the results into a JSON file")
+
+
+@dataclass(kw_only=True)
+class SquareStepFrameSource(FrameSource):
+    """
+    Black frames with a square shown every other `step_frames` frames
+
+    Times at which the square appeared are kept in `step_times`, so the
+    source must not prefetch.
+    """
+
+    steps: int
+    step_frames: int
+    size: int
+    step_times: list[float] = field(default_factory=list, init=False)
+
+    _frame_index: int = field(default=0, init=False, repr=False)
+    _frames: list[Frame] = field(default_factory=list, init=False, repr=False)
+
+    def _open(self) -> None:
+        self._frame_index = 0
+        self._frames = [np.zeros((self.size, self.size, 3), dtype=np.uint8) for _ in range(2)]
+        quarter = self.size // 4
+        self._frames[1][quarter : 3 * quarter, quarter : 3 * quarter] = 255
+
+    def _read(self) -> Frame | None:
+        # phases alternate between hidden and shown square, starting and ending hidden
+        phase, offset = divmod(self._frame_index, self.step_frames)
+        if phase > 2 * self.steps:
+            return None
+
+        shown = phase % 2 == 1
+        if shown and offset == 0:
+            self.step_times.append(time.monotonic())
+        self._frame_index += 1
+        return self._frames[shown]
+
+
+@dataclass
+class LatencyResult:
+    converter: str
+    chunk_size: int
+    latencies_ms: list[float]
+    undetected: int
+    underflows: int
+    xruns: int
+
+    def format(self) -> str:
+        if not self.latencies_ms:
+            latencies = "no change detected"
+        else:
+            p50, p95 = np.percentile(self.latencies_ms, [50, 95])
+            latencies = f"p50 {p50:7.1f}ms  p95 {p95:7.1f}ms  max {max(self.latencies_ms):7.1f}ms"
+        return (
+            f"{self.converter:50} {self.chunk_size:6}  {latencies}  undetected {self.undetected}"
+            f"  underflows {self.underflows}  xruns {self.xruns}"
+        )
+
+
+def detect_changes(
+    played: list[tuple[float, np.ndarray]],
+    step_times: list[float],
+    sample_rate: int,
+    settle_duration: float,
+) -> list[float | None]:
+    """
+    Latency of each step, `None` if the audio didn't change.
+
+    The audio changed once its RMS envelope moved 50% of the way from the
+    mean level before the step to the mean level the step settled at. Mean
+    levels (rather than medians) keep pulsing output of scanning converters
+    comparable.
+    """
+    if not played:
+        return [None] * len(step_times)
+
+    block = max(int(ENVELOPE_BLOCK_DURATION * sample_rate), 1)
+    signal = np.concatenate([chunk for _, chunk in played])
+    # chunks are played back to back from the first one on
+    start = played[0][0]
+    envelope = np.sqrt(np.mean(signal[: len(signal) // block * block].reshape(-1, block) ** 2, axis=1))
+    times = start + np.arange(len(envelope)) * block / sample_rate
+
+    latencies: list[float | None] = []
+    for step_time in step_times:
+        before = envelope[(times >= step_time - settle_duration / 2) & (times < step_time)]
+        settled = envelope[(times >= step_time + settle_duration / 2) & (times < step_time + settle_duration)]
+        if len(before) == 0 or len(settled) == 0:
+            latencies.append(None)
+            continue
+
+        level_before = float(np.mean(before))
+        level_settled = float(np.mean(settled))
+        logger.debug(f"levels before and after step: {level_before:.4f}, {level_settled:.4f}")
+        # converters changing pitch rather than loudness (e.g. shifters) can't be measured this way
+        if abs(level_settled - level_before) < max(MIN_LEVEL_CHANGE * max(level_before, level_settled), 1e-4):
+            latencies.append(None)
+            continue
+
+        # the previous appearance may still be audible if latency exceeds `settle_duration`, wait for it to end
+        progress = (envelope - level_before) / (level_settled - level_before)
+        unchanged = np.flatnonzero((times >= step_time) & (progress < 0.5))
+        if len(unchanged) == 0:
+            latencies.append(None)
+            continue
+
+        changed = np.flatnonzero(progress[unchanged[0] :] >= 0.5)
+        latencies.append(float(times[unchanged[0] + changed[0]] - step_time) if len(changed) else None)
+    return latencies
+
+
+def measure(spec: str, chunk_size: int, args: LatencyArgs.shape) -> LatencyResult:
+    converter = instantiate_converter(Args.parse(["--sample-rate", str(args.sample_rate), *shlex.split(spec)]))
+    source = SquareStepFrameSource(steps=args.steps, step_frames=args.step_frames, size=args.size, fps=args.fps)
+    output_stream = LoopbackAudioOutputStream(sample_rate=args.sample_rate, chunk_size=chunk_size)
+
+    source.open()
+    output_stream.open()
+    try:
+        main_loop(source, converter, output_stream, PipelineStats())
+    finally:
+        output_stream.close()
+        converter.close()
+        source.close()
+
+    latencies = detect_changes(
+        output_stream.played,
+        source.step_times,
+        args.sample_rate,
+        settle_duration=args.step_frames / args.fps,
+    )
+    return LatencyResult(
+        converter=spec,
+        chunk_size=chunk_size,
+        latencies_ms=[1000 * latency for latency in latencies if latency is not None],
+        undetected=sum(latency is None for latency in latencies),
+        underflows=output_stream.underflow_count,
+        xruns=output_stream.xrun_count,
+    )
+
+
+def main() -> int:
+    init_logging(level=logging.INFO)
+    args = LatencyArgs.parse()
+
+    results = []
+    for spec in args.converters:
+        for chunk_size in args.chunk_sizes or [1024]:
+            result = measure(spec, chunk_size, args)
+            results.append(result)
+            print(result.format(), flush=True)
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,26 +1,100 @@
-import logging
+from queue import SimpleQueue
 from typing import ClassVar
+import atexit
+import logging
+import threading
+import time
+
 
+# edited version of https://stackoverflow.com/a/56944256/8844422
+class ColoredLevelnameFormatter(logging.Formatter):
+    COLORS: ClassVar = {
+        logging.DEBUG: "\x1b[30m",
+        logging.INFO: "\x1b[1;34m",
+        logging.WARNING: "\x1b[1;33m",
+        logging.ERROR: "\x1b[1;31m",
+        logging.CRITICAL: "\x1b[37;41m",
+    }
 
-def init_logging(level: int = logging.DEBUG) -> None:
-    # edited version of https://stackoverflow.com/a/56944256/8844422
-    class ColoredLevelnameFormatter(logging.Formatter):
-        COLORS: ClassVar = {
-            logging.DEBUG: "\x1b[30m",
-            logging.INFO: "\x1b[1;34m",
-            logging.WARNING: "\x1b[1;33m",
-            logging.ERROR: "\x1b[1;31m",
-            logging.CRITICAL: "\x1b[37;41m",
-        }
+    def __init__(self) -> None:
+        super().__init__()
+        self._formatters: dict[int, logging.Formatter] = {}
 
-        def format(self, record):
+    def format(self, record: logging.LogRecord) -> str:
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
             color = self.COLORS.get(record.levelno)
             fmt = f"{{asctime}} {{name:20}} {color}{{levelname:10}}\033[0m {{message}}"
-            formatter = logging.Formatter(fmt, style="{")
-            return formatter.format(record)
+            formatter = self._formatters[record.levelno] = logging.Formatter(fmt, style="{")
+        return formatter.format(record)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most one record per `interval` seconds for each message template
+
+    Records are told apart by logger name and unformatted message, so
+    repeated messages have to be logged lazily, e.g.
+    `logger.warning("underflow by %d samples", count)`. The next record let
+    through reports how many were suppressed in the meantime.
+    """
+
+    def __init__(self, interval: float = 1.0, level: int = logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self._lock = threading.Lock()
+        self._last_emitted: dict[tuple[str, object], float] = {}
+        self._suppressed: dict[tuple[str, object], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_emitted.get(key, -self.interval) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+
+            self._last_emitted[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar suppressed)"
+        return True
+
+
+def init_logging(level: int = logging.INFO, warning_interval: float = 1.0) -> None:
+    """
+    Log into stderr from a background thread.
+
+    Emitting threads (including real-time ones, e.g. the audio callback) only
+    enqueue records, formatting and I/O happen on the listener's thread, so
+    objects passed as message arguments shouldn't be modified afterwards.
+    Repeated warnings are rate-limited to one per `warning_interval` seconds.
+    """
+    # pulls in `socket`, import only once logging is actually set up
+    from logging.handlers import QueueHandler, QueueListener
+
+    class DeferredQueueHandler(QueueHandler):
+        # `QueueHandler.prepare` formats the message on the emitting thread, leave it to the listener
+        def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+            return record
 
-    logger = logging.getLogger()
     handler = logging.StreamHandler()
     handler.setFormatter(ColoredLevelnameFormatter())
-    logger.addHandler(handler)
+
+    queue: SimpleQueue[logging.LogRecord] = SimpleQueue()
+    queue_handler = DeferredQueueHandler(queue)
+    queue_handler.addFilter(RateLimitFilter(warning_interval))
+
+    listener = QueueListener(queue, handler, respect_handler_level=True)
+    listener.start()
+    # flush records still in the queue at exit
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger()
+    logger.addHandler(queue_handler)
     logger.setLevel(level)
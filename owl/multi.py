@@ -0,0 +1,288 @@
+"""
+Several simultaneous inputs (e.g. left and right cameras), each with its own converter
+
+Every source is read on its own capture thread and converted by its own
+converter instance, all converters render concurrently, so adding a source
+doesn't add up its rendering latency. Their outputs are mixed into
+
+- `stereo`: sources panned evenly from left to right
+- `channels`: one channel per source
+- `mono`: a single channel
+
+all scaled by per-source `--gains`.
+
+    owl-multi :0 :2 --converter "curve hilbert --order 2"
+    owl-multi left.mp4 "down.mp4=scan circular -c4 -n4 --ms-per-frame 500" -o out.wav --mix channels
+"""
+
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Literal, cast
+import logging
+import shlex
+import time
+
+from arcparse import arcparser, dict_option, option, positional
+
+from owl.__main__ import Args, instantiate_converter
+from owl.logging import init_logging
+
+
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+
+    from owl.converters import BaseConverter
+    from owl.frame_source import FrameSource
+    from owl.output_stream import AudioOutputStream
+    from owl.types import Frame, Signal
+
+
+logger = logging.getLogger("owl.multi")
+
+MixMode = Literal["mono", "stereo", "channels"]
+
+
+@arcparser
+class MultiArgs:
+    sources: list[str] = positional(
+        help=(
+            'inputs as for `owl -i`, optionally followed by "=<converter arguments>" to use a different converter'
+            ' than --converter (e.g. ":1=scan circular -c4 -n4 --ms-per-frame 500")'
+        ),
+    )
+    converter: str = option(
+        default="curve hilbert --order 2",
+        help='converter arguments as passed to `owl` for sources without their own (default: "curve hilbert --order 2")',
+    )
+    mix: str = dict_option(
+        {"stereo": "stereo", "channels": "channels", "mono": "mono"},
+        default="stereo",
+        help="pan sources across stereo, give each its own channel or mix them into one (default: stereo)",
+    )
+    # arcparse ignores defaults of list options, an empty list means the default
+    gains: list[float] = option(help="gain of each source (default: 1 for all)")
+    output: str | None = option("-o", help="wav file to write, plays the mix if omitted")
+    prefetch: int = option(default=8, help="frames decoded ahead for inputs other than cameras (default: 8)")
+    frame_cache: int | None = option(help="same as for `owl`")
+    sample_rate: int = option(default=48000)
+
+
+def mixing_matrix(mode: MixMode, gains: Sequence[float]) -> "npt.NDArray[np.float32]":
+    """
+    `(source, channel)` weights of each source in each output channel
+
+    Stereo uses equal-power panning, each channel is normalized by the sum
+    of its pan weights (and the mono mix by the source count), so the mix
+    doesn't clip when all sources are loud.
+    """
+    import numpy as np
+
+    gains_column = np.array(gains, dtype=np.float32)[:, None]
+    if mode == "channels":
+        return cast("npt.NDArray[np.float32]", np.diag(gains_column[:, 0]))
+    if mode == "mono":
+        return cast("npt.NDArray[np.float32]", gains_column / len(gains))
+
+    # -1 is left, 1 is right, a single source stays centered
+    positions = np.linspace(-1, 1, len(gains)) if len(gains) > 1 else np.zeros(1)
+    angles = (positions + 1) * np.pi / 4
+    pan = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    return cast("npt.NDArray[np.float32]", (gains_column * pan / np.maximum(pan.sum(axis=0), 1)).astype(np.float32))
+
+
+@dataclass
+class SourcePipeline:
+    """
+    A frame source and the converter it feeds
+
+    Live pipelines read frames on a capture thread and convert the latest
+    one, offline pipelines read frames as their timestamps are reached by
+    the rendered audio.
+    """
+
+    name: str
+    source: "FrameSource"
+    converter: "BaseConverter"
+
+    _frame: "Frame | None" = field(default=None, init=False, repr=False)
+    _ended: Event = field(default_factory=Event, init=False, repr=False)
+    _thread: Thread | None = field(default=None, init=False, repr=False)
+    _time: float = field(default=0.0, init=False, repr=False)
+    _next_frame_time: float = field(default=0.0, init=False, repr=False)
+
+    @property
+    def ended(self) -> bool:
+        return self._ended.is_set()
+
+    def start(self, realtime: bool) -> None:
+        if realtime:
+            self._thread = Thread(target=self._capture_loop, daemon=True)
+            self._thread.start()
+
+    def render(self, count: int) -> "Signal":
+        """Next `count` samples, silence once the source ended."""
+        import numpy as np
+
+        if self._thread is None:
+            self._read_due_frames()
+        self._time += count / self.converter.sample_rate
+
+        frame = self._frame
+        if frame is None or self.ended:
+            return np.zeros(count, dtype=np.float32)
+        self.converter.update(self.converter.preprocess(frame))
+        return self.converter.get_samples(count)
+
+    def close(self) -> None:
+        self._ended.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.converter.close()
+        self.source.close()
+
+    def _read_due_frames(self) -> None:
+        while not self.ended and self._next_frame_time <= self._time:
+            if (frame := self.source.read()) is None:
+                logger.info("%s ended", self.name)
+                self._ended.set()
+                return
+            self._frame = frame
+            self._next_frame_time += 1 / self.source.fps
+
+    def _capture_loop(self) -> None:
+        delta = 1 / self.source.fps
+        next_frame = time.monotonic()
+        while not self.ended:
+            if (frame := self.source.read()) is None:
+                logger.error("couldn't read from %s", self.name)
+                self._ended.set()
+                return
+            self._frame = frame
+
+            next_frame += delta
+            if (remaining := next_frame - time.monotonic()) > 0:
+                time.sleep(remaining)
+
+
+@dataclass
+class MultiSourceRenderer:
+    """Render all pipelines concurrently and mix their outputs"""
+
+    pipelines: Sequence[SourcePipeline]
+    mix: MixMode = "stereo"
+    gains: Sequence[float] | None = None
+
+    def __post_init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=len(self.pipelines), thread_name_prefix="source")
+        self._matrix = mixing_matrix(self.mix, self.gains or [1.0] * len(self.pipelines))
+
+    @property
+    def channel_count(self) -> int:
+        return int(self._matrix.shape[1])
+
+    @property
+    def ended(self) -> bool:
+        return all(pipeline.ended for pipeline in self.pipelines)
+
+    def render(self, count: int) -> "Signal":
+        """Mixed samples, shaped `(count, channel_count)` unless mixed into one channel."""
+        import numpy as np
+
+        futures = [self._executor.submit(pipeline.render, count) for pipeline in self.pipelines]
+        signals = np.empty((count, len(self.pipelines)), dtype=np.float32)
+        for index, future in enumerate(futures):
+            signals[:, index] = future.result()
+
+        mixed = signals @ self._matrix
+        return cast("Signal", mixed[:, 0] if self.channel_count == 1 else mixed)
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        for pipeline in self.pipelines:
+            pipeline.close()
+
+
+def parse_source(source: str, default_converter: str) -> tuple[str, str]:
+    """Input and converter arguments of a `<input>[=<converter arguments>]` source."""
+    input, separator, converter = source.partition("=")
+    return input, converter if separator else default_converter
+
+
+def instantiate_output_stream(args: MultiArgs.shape, channel_count: int) -> "AudioOutputStream":
+    from owl.output_stream import FileAudioOutputStream, LiveAudioOutputStream
+
+    if args.output is not None:
+        return FileAudioOutputStream(filename=args.output, channels=channel_count, sample_rate=args.sample_rate)
+    return LiveAudioOutputStream(channels=channel_count, sample_rate=args.sample_rate)
+
+
+def multi_loop(
+    renderer: MultiSourceRenderer,
+    output_stream: "AudioOutputStream",
+    fps: float,
+    realtime: bool,
+) -> None:
+    """Render a block per frame of the fastest source until all sources ended."""
+    delta = 1 / fps
+    samples_per_block = int(delta * output_stream.sample_rate)
+
+    next_block = time.monotonic()
+    while not renderer.ended:
+        output_stream.write(renderer.render(samples_per_block))
+
+        if realtime:
+            next_block += delta
+            if (remaining := next_block - time.monotonic()) > 0:
+                time.sleep(remaining)
+
+
+def main() -> int:
+    from owl.frame_source import FrameSourceError, instantiate_frame_source
+
+    init_logging(level=logging.INFO)
+    args = MultiArgs.parse()
+
+    if not args.sources:
+        logger.error("error: no sources given")
+        return 1
+    if args.gains and len(args.gains) != len(args.sources):
+        logger.error(f"error: got {len(args.gains)} gains for {len(args.sources)} sources")
+        return 1
+
+    pipelines: list[SourcePipeline] = []
+    try:
+        for source_spec in args.sources:
+            input, converter_args = parse_source(source_spec, args.converter)
+            parsed = Args.parse(["--sample-rate", str(args.sample_rate), *shlex.split(converter_args)])
+            source = instantiate_frame_source(input, args.prefetch, args.frame_cache)
+            source.open()
+            pipelines.append(SourcePipeline(input, source, instantiate_converter(parsed)))
+    except FrameSourceError as e:
+        logger.error(f"error: {e}")
+        for pipeline in pipelines:
+            pipeline.close()
+        return 1
+
+    renderer = MultiSourceRenderer(pipelines, mix=cast(MixMode, args.mix), gains=args.gains or None)
+    output_stream = instantiate_output_stream(args, renderer.channel_count)
+    realtime = args.output is None or any(source.startswith(":") for source in args.sources)
+
+    try:
+        output_stream.open()
+        for pipeline in pipelines:
+            pipeline.start(realtime)
+        multi_loop(renderer, output_stream, max(pipeline.source.fps for pipeline in pipelines), realtime)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        output_stream.close()
+        renderer.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
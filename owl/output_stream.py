@@ -1,15 +1,22 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Mapping
+from typing import TYPE_CHECKING, Mapping
 import logging
+import threading
+import time
 import wave
 
 import numpy as np
-import pyaudio
 
+from owl.sample_queue import SampleQueue
 from owl.types import Signal
 
 
+# loading PortAudio is slow and probes the audio stack, only import it for live playback
+if TYPE_CHECKING:
+    import pyaudio
+
+
 logger = logging.getLogger("output_stream")
 
 
@@ -18,6 +25,10 @@ class AudioOutputStream(ABC):
     sample_rate: int = 48000
     chunk_size: int = 1024
 
+    # chunks the device wanted but we didn't have enough samples for, and device-reported over/underruns
+    underflow_count: int = field(default=0, init=False)
+    xrun_count: int = field(default=0, init=False)
+
     @abstractmethod
     def open(self) -> None:
         ...
@@ -33,8 +44,18 @@ class AudioOutputStream(ABC):
 
 @dataclass
 class LiveAudioOutputStream(AudioOutputStream):
-    _stream: pyaudio.Stream | None = field(default=None)
+    """
+    Play signal through PortAudio, written signals are also copied into `monitor` (e.g. for visualization)
+
+    Multichannel signals are shaped `(samples, channels)`, their mix is monitored.
+    """
+
+    channels: int = 1
+    monitor: SampleQueue | None = None
+    _stream: "pyaudio.Stream | None" = field(default=None)
     _queue: list[float] = field(default_factory=list)
+    # `pyaudio.paContinue`, resolved once on open rather than in every callback
+    _continue_flag: int = field(default=0, init=False)
 
     def open(self) -> None:
         if self._stream is not None:
@@ -42,10 +63,13 @@ class LiveAudioOutputStream(AudioOutputStream):
 
         logger.info("opening PyAudio stream")
 
+        import pyaudio
+
+        self._continue_flag = pyaudio.paContinue
         pa = pyaudio.PyAudio()
         self._stream = pa.open(
             rate=self.sample_rate,
-            channels=1,
+            channels=self.channels,
             format=pyaudio.paFloat32,
             output=True,
             frames_per_buffer=self.chunk_size,
@@ -53,7 +77,10 @@ class LiveAudioOutputStream(AudioOutputStream):
         )
 
     def write(self, signal: Signal) -> None:
-        self._queue.extend(signal)
+        # interleaved, as PortAudio expects multichannel frames
+        self._queue.extend(np.ravel(signal))
+        if self.monitor is not None:
+            self.monitor.push(signal if np.ndim(signal) == 1 else np.mean(signal, axis=1))
 
     def close(self) -> None:
         if self._stream is None:
@@ -70,18 +97,80 @@ class LiveAudioOutputStream(AudioOutputStream):
         time_info: Mapping[str, float],
         status_flags: int,
     ) -> tuple[bytes, int]:
-        if len(self._queue) < frame_count:
-            logger.warning(f"underflow, need {frame_count} samples but have only {len(self._queue)}")
-            return np.zeros((frame_count,), dtype=np.float32).tobytes(), pyaudio.paContinue
+        if status_flags:
+            self.xrun_count += 1
+        sample_count = frame_count * self.channels
+        if len(self._queue) < sample_count:
+            self.underflow_count += 1
+            logger.warning("underflow, need %d samples but have only %d", sample_count, len(self._queue))
+            return np.zeros((sample_count,), dtype=np.float32).tobytes(), self._continue_flag
 
-        data = self._queue[:frame_count]
-        self._queue = self._queue[frame_count:]
-        return np.array(data, dtype=np.float32).tobytes(), pyaudio.paContinue
+        data = self._queue[:sample_count]
+        self._queue = self._queue[sample_count:]
+        return np.array(data, dtype=np.float32).tobytes(), self._continue_flag
+
+
+@dataclass
+class LoopbackAudioOutputStream(AudioOutputStream):
+    """
+    Null sink consuming written signal in real time, `chunk_size` samples at a time like an audio device
+
+    Playback starts with the first write. Consumed chunks are recorded
+    together with the time their first sample would be heard, assuming one
+    more chunk is buffered in the device.
+    """
+
+    played: list[tuple[float, Signal]] = field(default_factory=list, init=False)
+
+    def __post_init__(self) -> None:
+        self._queue = SampleQueue()
+        self._thread: threading.Thread | None = None
+        self._started = threading.Event()
+        self._closed = threading.Event()
+
+    def open(self) -> None:
+        if self._thread is not None:
+            raise Exception("output stream already open")
+
+        self._thread = threading.Thread(target=self._playback_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, signal: Signal) -> None:
+        self._queue.push(signal)
+        self._started.set()
+
+    def close(self) -> None:
+        if self._thread is None:
+            raise Exception("output stream is not open")
+
+        self._closed.set()
+        self._started.set()
+        self._thread.join()
+        self._thread = None
+
+    def _playback_loop(self) -> None:
+        self._started.wait()
+        chunk_duration = self.chunk_size / self.sample_rate
+        next_chunk = time.monotonic()
+        while not self._closed.is_set():
+            if len(self._queue) < self.chunk_size:
+                self.underflow_count += 1
+            self.played.append((next_chunk + chunk_duration, self._queue.pop(self.chunk_size)))
+
+            next_chunk += chunk_duration
+            # a device buffering two chunks only glitches once it's late by more than a chunk
+            if (remaining := next_chunk - time.monotonic()) > 0:
+                time.sleep(remaining)
+            elif remaining < -chunk_duration:
+                self.xrun_count += 1
 
 
 @dataclass
 class FileAudioOutputStream(AudioOutputStream):
+    """Write signal into a wav file, multichannel signals are shaped `(samples, channels)`"""
+
     filename: str
+    channels: int = 1
     _stream: wave.Wave_write | None = field(default=None)
 
     def open(self) -> None:
@@ -91,7 +180,7 @@ class FileAudioOutputStream(AudioOutputStream):
         logger.info("opening wav stream")
 
         stream = wave.open(self.filename, mode="wb")
-        stream.setnchannels(1)
+        stream.setnchannels(self.channels)
         stream.setsampwidth(2)
         stream.setframerate(self.sample_rate)
         self._stream = stream
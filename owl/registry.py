@@ -0,0 +1,55 @@
+"""
+Pluggable classes by their command-line names
+
+Classes are referenced by `"<module>:<attribute>"` paths and only imported
+once resolved, so parsing arguments (or printing `--help`) doesn't pay for
+importing OpenCV, NumPy or PortAudio.
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+import importlib
+
+from owl.converters.static.clustering import ClusteringMode
+
+
+@dataclass(frozen=True)
+class LazyRef:
+    """Reference to an object by its `"<module>:<attribute>"` path"""
+
+    path: str
+
+    def resolve(self) -> Any:
+        module_name, _, attribute = self.path.partition(":")
+        return getattr(importlib.import_module(module_name), attribute)
+
+
+CONVERTERS: Mapping[str, LazyRef] = {
+    "curve": LazyRef("owl.converters.static.curve:CurveConverter"),
+    "scan": LazyRef("owl.converters.dynamic.scan:ScanConverter"),
+    "shifters": LazyRef("owl.converters.static.shifters:ShiftersConverter"),
+    "spread": LazyRef("owl.converters.static.spread:HilbertSpreadConverter"),
+    "focus": LazyRef("owl.converters.focus:FocusConverter"),
+}
+
+SCAN_CONVERTERS: Mapping[str, LazyRef] = {
+    "vertical": LazyRef("owl.converters.dynamic.scan:VerticalScanConverter"),
+    "horizontal": LazyRef("owl.converters.dynamic.scan:HorizontalScanConverter"),
+    "circular": LazyRef("owl.converters.dynamic.scan:CircularScanConverter"),
+    "spiral": LazyRef("owl.converters.dynamic.scan:SpiralScanConverter"),
+    "radial": LazyRef("owl.converters.dynamic.scan:RadialScanConverter"),
+}
+
+CURVES: Mapping[str, LazyRef] = {
+    "hilbert": LazyRef("owl.curves:HilbertCurve"),
+    "peano": LazyRef("owl.curves:PeanoCurve"),
+}
+
+AUDIO_SCALES: Mapping[str, LazyRef] = {
+    "mel": LazyRef("owl.audio_scale:MelScale"),
+    "bark": LazyRef("owl.audio_scale:BarkScale"),
+}
+
+CLUSTERING_MODES: tuple[str, ...] = tuple(mode.value for mode in ClusteringMode)
+
@@ -0,0 +1,161 @@
+"""
+Content-addressed cache of rendered audio
+
+Renders are stored under a key hashed from the input file's contents, the
+fully resolved converter parameters and the owl version, so any change to
+either invalidates them. The cache is bounded in size, least recently used
+renders are evicted first.
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from enum import Enum
+from importlib import metadata
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import wave
+
+import numpy as np
+
+from owl.registry import LazyRef
+from owl.types import Signal
+
+
+logger = logging.getLogger("render_cache")
+
+
+def _owl_version() -> str:
+    try:
+        return metadata.version("owl-framework")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+OWL_VERSION = _owl_version()
+DEFAULT_DIRECTORY = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "owl" / "renders"
+DEFAULT_MAX_SIZE = 1 << 30
+# input digests by path, size and mtime, so unchanged inputs aren't re-hashed on every lookup
+DIGEST_INDEX = "digests.json"
+
+
+def canonical_params(value: object) -> object:
+    """JSON-serializable, deterministic form of converter parameters (e.g. parsed arguments or a model)."""
+    if value is None or isinstance(value, bool | int | float | str):
+        return value
+    if isinstance(value, LazyRef):
+        return value.path
+    if isinstance(value, type):
+        return f"{value.__module__}:{value.__qualname__}"
+    if isinstance(value, Enum):
+        return canonical_params(value.value)
+    if isinstance(value, np.ndarray):
+        return {"dtype": str(value.dtype), "shape": value.shape, "sha256": hashlib.sha256(value.tobytes()).hexdigest()}
+    if isinstance(value, Mapping):
+        return {str(key): canonical_params(item) for key, item in sorted(value.items())}
+    if isinstance(value, list | tuple):
+        return [canonical_params(item) for item in value]
+    if hasattr(value, "__dict__"):
+        params = {key: item for key, item in vars(value).items() if not key.startswith("_")}
+        return {"type": canonical_params(type(value)), **canonical_params(params)}  # type: ignore[dict-item]
+    raise ValueError(f"can't derive a cache key from {value!r}")
+
+
+def read_wav(path: Path) -> Signal:
+    """Samples of a wav file written by `FileAudioOutputStream`, shaped `(samples, channels)` if multichannel."""
+    with wave.open(str(path), "rb") as f:
+        if f.getsampwidth() != 2:
+            raise Exception(f"{path} is not a 16-bit wav file")
+        channels = f.getnchannels()
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+
+    signal = (data / 16383).astype(np.float32)
+    return signal.reshape(-1, channels) if channels > 1 else signal
+
+
+@dataclass(kw_only=True)
+class RenderCache:
+    directory: Path = DEFAULT_DIRECTORY
+    max_size: int = DEFAULT_MAX_SIZE
+
+    def key(self, input_path: Path, params: object) -> str:
+        payload = {
+            "input": self._input_digest(input_path),
+            "params": canonical_params(params),
+            "version": OWL_VERSION,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str, suffix: str = ".wav") -> Path | None:
+        path = self._entry_path(key, suffix)
+        if not path.exists():
+            return None
+
+        # entries are evicted by modification time, touching marks them as recently used
+        path.touch()
+        logger.info("render cache hit %s", key[:12])
+        return path
+
+    def put(self, key: str, rendered: Path) -> Path:
+        """Copy a finished render into the cache."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key, rendered.suffix)
+
+        # copy under a temporary name first, concurrent readers never see a partial entry
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".partial", delete=False) as f:
+            temporary = Path(f.name)
+        shutil.copyfile(rendered, temporary)
+        os.replace(temporary, path)
+
+        logger.info("stored render %s (%.1f MiB)", key[:12], path.stat().st_size / (1 << 20))
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Path | None = None) -> None:
+        """Delete least recently used entries until the cache fits into `max_size`."""
+        entries = [
+            path
+            for path in self.directory.iterdir()
+            if path.name != DIGEST_INDEX and path.suffix != ".partial" and path != keep
+        ]
+        stats = {path: path.stat() for path in entries}
+        total = sum(stat.st_size for stat in stats.values())
+        if keep is not None:
+            total += keep.stat().st_size
+
+        for path in sorted(entries, key=lambda path: stats[path].st_mtime):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= stats[path].st_size
+            logger.debug("evicted render %s", path.name)
+
+    def _entry_path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def _input_digest(self, input_path: Path) -> str:
+        stat = input_path.stat()
+        index_path = self.directory / DIGEST_INDEX
+        try:
+            index = json.loads(index_path.read_text())
+        except (OSError, ValueError):
+            index = {}
+
+        name = str(input_path.resolve())
+        signature = [stat.st_size, stat.st_mtime_ns]
+        if (entry := index.get(name)) is not None and entry["signature"] == signature:
+            return str(entry["digest"])
+
+        with open(input_path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+
+        index[name] = {"signature": signature, "digest": digest}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, suffix=".partial", delete=False) as f:
+            json.dump(index, f)
+        os.replace(f.name, index_path)
+        return digest
@@ -0,0 +1,66 @@
+import threading
+
+import numpy as np
+
+from owl.types import Signal
+
+
+class SampleQueue:
+    """
+    Thread-safe FIFO of float32 audio samples backed by a ring buffer.
+
+    The buffer doubles in size whenever a push doesn't fit, so pushing and
+    popping never allocate in the steady state other than the popped copy.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, signal: Signal) -> None:
+        with self._lock:
+            count = len(signal)
+            if self._size + count > len(self._buffer):
+                self._grow(self._size + count)
+
+            end = (self._start + self._size) % len(self._buffer)
+            first = min(count, len(self._buffer) - end)
+            self._buffer[end : end + first] = signal[:first]
+            self._buffer[: count - first] = signal[first:]
+            self._size += count
+
+    def pop(self, count: int) -> Signal:
+        """
+        Pop exactly `count` samples, padding with trailing zeros on underflow.
+        """
+        out = np.zeros(count, dtype=np.float32)
+        with self._lock:
+            available = min(count, self._size)
+            first = min(available, len(self._buffer) - self._start)
+            out[:first] = self._buffer[self._start : self._start + first]
+            out[first:available] = self._buffer[: available - first]
+            self._start = (self._start + available) % len(self._buffer)
+            self._size -= available
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = len(self._buffer)
+        while capacity < min_capacity:
+            capacity *= 2
+
+        buffer = np.zeros(capacity, dtype=np.float32)
+        first = min(self._size, len(self._buffer) - self._start)
+        buffer[:first] = self._buffer[self._start : self._start + first]
+        buffer[first : self._size] = self._buffer[: self._size - first]
+        self._buffer = buffer
+        self._start = 0
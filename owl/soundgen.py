@@ -1,6 +1,6 @@
 from collections.abc import Iterable, Iterator, Sequence
-from dataclasses import dataclass
-from typing import Self
+from dataclasses import dataclass, replace
+from typing import Self, cast
 import itertools
 import logging
 
@@ -51,7 +51,7 @@ class SineGen:
         self._frequency = initial_frequency
         self._volume = initial_volume
 
-        logger.debug(f"initializing SineGen at {initial_frequency:.02f} hz")
+        logger.debug("initializing SineGen at %.02f hz", initial_frequency)
 
         self._phase_gen: Iterator[float] = self._generate_phase_signal(initial_frequency, sample_rate)
         self._vol_gen: Iterator[float] = itertools.repeat(initial_volume)
@@ -117,3 +117,87 @@ class MultiSineGen:
     @classmethod
     def blank(cls, count: int, sample_rate: int = 48000) -> Self:
         return cls(freqs=[440] * count, sample_rate=sample_rate)
+
+
+@dataclass
+class MultiSineBlockGen:
+    """
+    Render consecutive blocks of fixed-frequency sines, each block with its own volumes.
+
+    Oscillators are precomputed for a single block (starting at phase 0), so
+    memory doesn't grow with the block count. Each block, including the
+    first one of the next call, is that precomputed block rotated to the
+    block's starting phases, so each call boils down to two matrix products.
+    Each block starts with a linear volume crossfade from the previous
+    block's volumes lasting `transient_duration` (capped at the block length).
+    """
+
+    freqs: Sequence[float]
+    block_count: int
+    samples_per_block: int
+    transient_duration: float = 0.01
+    sample_rate: int = 48000
+
+    def __post_init__(self) -> None:
+        freqs = np.asarray(self.freqs, dtype=np.float64)
+        omegas = 2 * np.pi * freqs / self.sample_rate
+
+        # (freq, sample in block)
+        phases = np.outer(omegas, np.arange(self.samples_per_block))
+        # computed in float64, stored in float32 without a float64 intermediate
+        self._sin_block = np.sin(phases, out=np.empty(phases.shape, dtype=np.float32))
+        self._cos_block = np.cos(phases, out=np.empty(phases.shape, dtype=np.float32))
+
+        # (block, freq) phase of each block's first sample relative to the first block
+        self._block_phases = np.outer(np.arange(self.block_count), omegas * self.samples_per_block) % (2 * np.pi)
+        self._phase_step = (omegas * self.block_count * self.samples_per_block) % (2 * np.pi)
+        self._phases = np.zeros(len(freqs), dtype=np.float64)
+        self._volumes = np.zeros(len(freqs), dtype=np.float64)
+
+        transient_samples = min(int(self.transient_duration * self.sample_rate), self.samples_per_block)
+        self._transient_samples = transient_samples
+        self._fade_out = (1 - np.linspace(0, 1, transient_samples, endpoint=False)).astype(np.float32)
+
+    def render(self, volumes: npt.NDArray[np.floating]) -> Signal:
+        """
+        Render all blocks at once from a `(block_count, len(freqs))` volume matrix.
+        """
+        volumes = np.asarray(volumes, dtype=np.float64)
+        assert volumes.shape == (self.block_count, len(self.freqs))
+
+        # sin(x + p) = sin(x) cos(p) + cos(x) sin(p), with p the starting phase of each block
+        block_phases = self._phases + self._block_phases
+        sin_weights = np.cos(block_phases)
+        cos_weights = np.sin(block_phases)
+
+        def weighted_sum(weights: npt.NDArray[np.float64], samples: slice = slice(None)) -> npt.NDArray[np.float32]:
+            # (block, freq) x (freq, sample) -> (block, sample)
+            return cast(
+                npt.NDArray[np.float32],
+                (weights * sin_weights).astype(np.float32) @ self._sin_block[:, samples]
+                + (weights * cos_weights).astype(np.float32) @ self._cos_block[:, samples],
+            )
+
+        signal = weighted_sum(volumes)
+
+        # crossfade from each block's predecessor volumes
+        if self._transient_samples > 0:
+            previous_volumes = np.vstack([self._volumes, volumes[:-1]])
+            transient = slice(0, self._transient_samples)
+            signal[:, transient] += weighted_sum(previous_volumes - volumes, transient) * self._fade_out
+
+        self._phases = (self._phases + self._phase_step) % (2 * np.pi)
+        self._volumes = volumes[-1]
+        return signal.reshape(-1) / len(self.freqs)
+
+    def reshaped(self, *, freqs: Sequence[float] | None = None, samples_per_block: int | None = None) -> Self:
+        """Copy with different frequencies or block length, continuing from the current phases and volumes."""
+        gen = replace(
+            self,
+            freqs=self.freqs if freqs is None else freqs,
+            samples_per_block=self.samples_per_block if samples_per_block is None else samples_per_block,
+        )
+        assert len(gen.freqs) == len(self.freqs)
+        gen._phases = self._phases.copy()
+        gen._volumes = self._volumes.copy()
+        return gen
@@ -0,0 +1,77 @@
+import threading
+
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import numpy.typing as npt
+
+from owl.types import Frame, Signal
+
+
+class Spectrogram:
+    """
+    Sliding-window STFT of an audio stream, rendered into a circular image
+
+    Pushed samples are only transformed once a whole new hop is available,
+    so each sample is windowed `window_size / hop_size` times in total no
+    matter how often `push` is called. Every hop becomes one column of a
+    grayscale image, low frequencies at the bottom.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        window_size: int = 2048,
+        hop_size: int = 512,
+        columns: int = 512,
+        max_frequency: float = 4000,
+        min_db: float = -80,
+    ):
+        self.hop_size = hop_size
+        self.min_db = min_db
+        self.lock = threading.Lock()
+
+        self._window = np.hanning(window_size).astype(np.float32)
+        # amplitude of a full-scale sine, the 0dB reference
+        self._reference = self._window.sum() / 2
+        self._rows = min(int(np.ceil(max_frequency * window_size / sample_rate)), window_size // 2 + 1)
+        self._pending: Signal = np.zeros(window_size - hop_size, dtype=np.float32)
+
+        # every column is written twice, so the latest `columns` are always a contiguous slice
+        self._columns = columns
+        self._image = np.zeros((self._rows, 2 * columns), dtype=np.uint8)
+        self._next_column = 0
+        self.version = 0
+
+    @property
+    def image(self) -> Frame:
+        """Latest columns oldest to newest (a view, hold `lock` while reading it)."""
+        return self._image[:, self._next_column : self._next_column + self._columns]
+
+    def push(self, signal: Signal) -> None:
+        samples = np.concatenate((self._pending, signal))
+        window_size = len(self._window)
+        hop_count = (len(samples) - window_size) // self.hop_size + 1
+        if hop_count <= 0:
+            self._pending = samples
+            return
+
+        windows = sliding_window_view(samples, window_size)[:: self.hop_size][:hop_count]
+        spectra = np.abs(np.fft.rfft(windows * self._window, axis=1)[:, : self._rows])
+        self._pending = samples[hop_count * self.hop_size :]
+
+        self._write_columns(self._to_pixels(spectra))
+
+    def _to_pixels(self, spectra: npt.NDArray[np.float32]) -> npt.NDArray[np.uint8]:
+        decibels = 20 * np.log10(np.maximum(spectra / self._reference, 1e-10))
+        pixels = np.clip((decibels - self.min_db) * (255 / -self.min_db), 0, 255).astype(np.uint8)
+        # hops are rows of `spectra`, flip them into columns with the lowest frequency at the bottom
+        return pixels.T[::-1]
+
+    def _write_columns(self, pixels: npt.NDArray[np.uint8]) -> None:
+        pixels = pixels[:, -self._columns :]
+        with self.lock:
+            for column in range(pixels.shape[1]):
+                self._image[:, self._next_column] = pixels[:, column]
+                self._image[:, self._next_column + self._columns] = pixels[:, column]
+                self._next_column = (self._next_column + 1) % self._columns
+            self.version += 1
@@ -0,0 +1,166 @@
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+
+import numpy as np
+
+
+logger = logging.getLogger("stats")
+
+# stages of a frame's way through the pipeline, in order
+STAGES = ("read", "preprocess", "update", "get_samples", "write")
+
+
+@dataclass
+class StageSummary:
+    count: int  # all-time number of spans, percentiles only cover the rolling window
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class RollingHistogram:
+    """Durations of the latest `window` spans of a single stage"""
+
+    def __init__(self, window: int = 1024):
+        self._durations = np.zeros(window, dtype=np.float64)
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def add(self, duration: float) -> None:
+        self._durations[self._count % len(self._durations)] = duration
+        self._count += 1
+
+    def summary(self) -> StageSummary:
+        durations = self._durations[: min(self._count, len(self._durations))]
+        if len(durations) == 0:
+            return StageSummary(count=0, p50_ms=0.0, p95_ms=0.0, p99_ms=0.0, max_ms=0.0)
+
+        p50, p95, p99 = 1000 * np.percentile(durations, [50, 95, 99])
+        return StageSummary(
+            count=self._count,
+            p50_ms=float(p50),
+            p95_ms=float(p95),
+            p99_ms=float(p99),
+            max_ms=float(1000 * durations.max()),
+        )
+
+
+class Span:
+    """Context manager adding its duration to a histogram"""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: RollingHistogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._histogram.add(time.perf_counter() - self._start)
+
+
+class PipelineStats:
+    """
+    Rolling timing histograms of pipeline stages
+
+    Stages are timed with `with stats.span("update"): ...`, which costs two
+    `perf_counter` calls and an array store. Each stage should only be
+    recorded from a single thread, different stages may come from
+    different threads.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._histograms = {stage: RollingHistogram(window) for stage in STAGES}
+        self._last_logged = time.monotonic()
+
+    def span(self, stage: str) -> Span:
+        return Span(self._histogram(stage))
+
+    def record(self, stage: str, duration: float) -> None:
+        self._histogram(stage).add(duration)
+
+    def summary(self) -> dict[str, StageSummary]:
+        return {stage: histogram.summary() for stage, histogram in self._histograms.items() if histogram.count}
+
+    def format(self) -> str:
+        return " | ".join(
+            f"{stage} p50 {s.p50_ms:.2f} p95 {s.p95_ms:.2f} p99 {s.p99_ms:.2f} max {s.max_ms:.2f}ms"
+            for stage, s in self.summary().items()
+        )
+
+    def log_periodically(self, interval: float) -> None:
+        """Log the summary if at least `interval` seconds passed since the last time, cheap to call per frame."""
+        if interval <= 0 or time.monotonic() - self._last_logged < interval:
+            return
+
+        self._last_logged = time.monotonic()
+        logger.info(self.format())
+
+    def dump_json(self, path: str | Path) -> None:
+        with open(path, "w") as f:
+            json.dump({stage: asdict(summary) for stage, summary in self.summary().items()}, f, indent=2)
+
+    def _histogram(self, stage: str) -> RollingHistogram:
+        # setdefault is atomic, so unknown stages can be added from any thread
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms.setdefault(stage, RollingHistogram(self._window))
+        return histogram
+
+
+class FrameProfiler:
+    """
+    cProfile the calling thread for the first `frame_count` frames
+
+    The report is written to `output` (loadable by `pstats` or snakeviz) if
+    given, otherwise the top functions by cumulative time are logged.
+    """
+
+    def __init__(self, frame_count: int, output: str | None = None):
+        self.frame_count = frame_count
+        self.output = output
+        self._profile = cProfile.Profile()
+        self._frames = 0
+        self._finished = False
+
+    def frame_started(self) -> None:
+        if self._frames == 0 and not self._finished:
+            self._profile.enable()
+
+    def frame_finished(self) -> None:
+        if self._finished:
+            return
+
+        self._frames += 1
+        if self._frames >= self.frame_count:
+            self.finish()
+
+    def finish(self) -> None:
+        """Stop profiling and report, also used when the input ends early."""
+        if self._finished or self._frames == 0:
+            return
+
+        self._profile.disable()
+        self._finished = True
+
+        if self.output is not None:
+            self._profile.dump_stats(self.output)
+            logger.info(f"profile of {self._frames} frames written to {self.output}")
+            return
+
+        report = io.StringIO()
+        pstats.Stats(self._profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(25)
+        logger.info(f"profile of {self._frames} frames:\n{report.getvalue()}")
@@ -0,0 +1,312 @@
+"""
+Recording and resynthesis of converter parameter traces
+
+Converters analyse frames into synthesis parameters, a trace keeps those
+parameters for every frame so audio can be synthesized again with a
+different sample rate, transient duration or synthesis engine without
+touching (decoding or analysing) the video:
+
+- `SineTrace`: frequencies and volumes of a `SineConverter`'s oscillators
+  and the time they were set at
+- `StripTrace`: volume matrices of the strips of a `ScanConverter`
+
+Traces are stored as compressed `.npz` files.
+
+    owl -i video.mp4 -o out.wav --trace trace.npz curve hilbert --order 3
+    owl-resynth trace.npz -o resynthesized.wav --sample-rate 22050 --transient-duration 0.05
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, cast
+import logging
+
+from arcparse import arcparser, dict_option, option, positional
+import numpy as np
+import numpy.typing as npt
+
+from owl.logging import init_logging
+from owl.soundgen import MultiSineBlockGen, MultiSineGen
+from owl.types import Signal
+
+
+if TYPE_CHECKING:
+    from owl.converters import BaseConverter
+
+
+logger = logging.getLogger("trace")
+
+SineEngine = Literal["vectorized", "sine-gen"]
+
+
+@dataclass
+class SineTrace:
+    """
+    Oscillator parameters of a `SineConverter`, one row per frame
+
+    `times[i]` is the time (in seconds of emitted audio) the `i`-th
+    frequencies and volumes were set at, `duration` the total length of the
+    emitted audio.
+    """
+
+    sample_rate: int
+    transient_duration: float
+    times: list[float] = field(default_factory=list)
+    frequencies: list[npt.NDArray[np.float64]] = field(default_factory=list)
+    volumes: list[npt.NDArray[np.float64]] = field(default_factory=list)
+    duration: float = 0.0
+
+    def append(self, frequencies: npt.NDArray[np.float64], volumes: npt.NDArray[np.float64]) -> None:
+        self.times.append(self.duration)
+        self.frequencies.append(np.array(frequencies, dtype=np.float64))
+        self.volumes.append(np.array(volumes, dtype=np.float64))
+
+    def advance(self, count: int) -> None:
+        """Account for `count` emitted samples."""
+        self.duration += count / self.sample_rate
+
+    def save(self, path: str | Path) -> None:
+        np.savez_compressed(
+            path,
+            kind="sines",
+            sample_rate=self.sample_rate,
+            transient_duration=self.transient_duration,
+            duration=self.duration,
+            times=np.array(self.times, dtype=np.float64),
+            frequencies=np.array(self.frequencies, dtype=np.float32),
+            volumes=np.array(self.volumes, dtype=np.float32),
+        )
+
+    def synthesize(
+        self,
+        sample_rate: int | None = None,
+        transient_duration: float | None = None,
+        engine: SineEngine = "vectorized",
+    ) -> Signal:
+        sample_rate = sample_rate or self.sample_rate
+        transient_duration = self.transient_duration if transient_duration is None else transient_duration
+
+        # segment boundaries are rounded from absolute times, so they don't drift apart over long traces
+        boundaries = np.round(np.array([*self.times, self.duration]) * sample_rate).astype(np.int64)
+        lengths = np.diff(boundaries)
+        render = self._synthesize_sine_gen if engine == "sine-gen" else self._synthesize_vectorized
+        segments = render(lengths, sample_rate, int(transient_duration * sample_rate))
+        return np.concatenate([np.zeros(boundaries[0] if len(self.times) else 0, dtype=np.float32), *segments])
+
+    def _synthesize_sine_gen(self, lengths: npt.NDArray[np.int64], sample_rate: int, transient: int) -> list[Signal]:
+        """Replay through `MultiSineGen`, the same way the converter produced its output."""
+        if not self.times:
+            return []
+
+        sine_gen = MultiSineGen(self.frequencies[0].tolist(), sample_rate=sample_rate)
+        segments = []
+        for i, length in enumerate(lengths):
+            transient_duration = 0 if i == 0 else transient / sample_rate
+            sine_gen.set_frequencies(self.frequencies[i], transient_duration=transient_duration)
+            sine_gen.set_volumes(self.volumes[i], transient_duration=transient_duration)
+            segments.append(sine_gen.get_next_samples(int(length)).astype(np.float32))
+        return segments
+
+    def _synthesize_vectorized(self, lengths: npt.NDArray[np.int64], sample_rate: int, transient: int) -> list[Signal]:
+        """
+        All oscillators of a frame at once, with continuous phases
+
+        Frequencies glide geometrically and volumes linearly to their new
+        values over `transient` samples, like in `SineGen`.
+        """
+        if not self.times:
+            return []
+
+        phases = np.zeros(len(self.frequencies[0]), dtype=np.float64)
+        frequencies = self.frequencies[0]
+        volumes = np.zeros_like(phases)
+        segments = []
+        for i, length in enumerate(lengths):
+            # the first frame is applied immediately
+            ramp = min(transient if i > 0 else 0, int(length))
+            segment_frequencies = np.empty((len(phases), int(length)))
+            segment_volumes = np.empty_like(segment_frequencies)
+            segment_frequencies[:, ramp:] = self.frequencies[i][:, None]
+            segment_volumes[:, ramp:] = self.volumes[i][:, None]
+            if ramp > 0:
+                segment_frequencies[:, :ramp] = np.geomspace(frequencies, self.frequencies[i], ramp, axis=1)
+                segment_volumes[:, :ramp] = np.linspace(volumes, self.volumes[i], ramp, axis=1)
+
+            # phase of each sample, starting where the previous segment ended
+            increments = np.cumsum(2 * np.pi * segment_frequencies / sample_rate, axis=1)
+            segment_phases = phases[:, None] + np.hstack([np.zeros((len(phases), 1)), increments[:, :-1]])
+            if length > 0:
+                phases = (phases + increments[:, -1]) % (2 * np.pi)
+
+            segments.append((np.sin(segment_phases) * segment_volumes).mean(axis=0).astype(np.float32))
+            frequencies, volumes = self.frequencies[i], self.volumes[i]
+        return segments
+
+
+@dataclass
+class StripTrace:
+    """
+    Volume matrices of a `ScanConverter`, `(strip_count, len(frequencies))` per frame
+
+    `times[i]` is the time (in seconds of rendered audio) the `i`-th frame's
+    strips start at. Frames are rendered back to back, each preceded by the
+    sound cue, if any.
+    """
+
+    sample_rate: int
+    frequencies: list[float]
+    ms_per_frame: int
+    transient_duration: float
+    sound_cue: Signal | None = None
+    times: list[float] = field(default_factory=list)
+    volumes: list[npt.NDArray[np.float64]] = field(default_factory=list)
+    duration: float = 0.0
+
+    def append(self, volumes: npt.NDArray[np.floating], duration: float) -> None:
+        """Record a frame's volumes rendered into `duration` seconds of strips."""
+        if self.sound_cue is not None:
+            self.duration += len(self.sound_cue) / self.sample_rate
+        self.times.append(self.duration)
+        self.volumes.append(np.array(volumes, dtype=np.float64))
+        self.duration += duration
+
+    def save(self, path: str | Path) -> None:
+        np.savez_compressed(
+            path,
+            kind="strips",
+            sample_rate=self.sample_rate,
+            frequencies=np.array(self.frequencies, dtype=np.float64),
+            ms_per_frame=self.ms_per_frame,
+            transient_duration=self.transient_duration,
+            sound_cue=self.sound_cue if self.sound_cue is not None else np.zeros(0, dtype=np.float32),
+            duration=self.duration,
+            times=np.array(self.times, dtype=np.float64),
+            volumes=np.array(self.volumes, dtype=np.float32),
+        )
+
+    def synthesize(
+        self,
+        sample_rate: int | None = None,
+        transient_duration: float | None = None,
+        ms_per_frame: int | None = None,
+    ) -> Signal:
+        sample_rate = sample_rate or self.sample_rate
+        ms_per_frame = ms_per_frame or self.ms_per_frame
+        if not self.volumes:
+            return np.zeros(0, dtype=np.float32)
+
+        strip_count = self.volumes[0].shape[0]
+        block_gen = MultiSineBlockGen(
+            self.frequencies,
+            block_count=strip_count,
+            samples_per_block=int(ms_per_frame / 1000 * sample_rate / strip_count),
+            transient_duration=self.transient_duration if transient_duration is None else transient_duration,
+            sample_rate=sample_rate,
+        )
+        sound_cue = self._resampled_sound_cue(sample_rate)
+
+        segments = []
+        for volumes in self.volumes:
+            if sound_cue is not None:
+                segments.append(sound_cue)
+            segments.append(block_gen.render(volumes))
+        return np.concatenate(segments)
+
+    def _resampled_sound_cue(self, sample_rate: int) -> Signal | None:
+        if self.sound_cue is None or sample_rate == self.sample_rate:
+            return self.sound_cue
+
+        duration = len(self.sound_cue) / self.sample_rate
+        times = np.arange(int(duration * sample_rate)) / sample_rate
+        return np.interp(times, np.arange(len(self.sound_cue)) / self.sample_rate, self.sound_cue).astype(np.float32)
+
+
+Trace = SineTrace | StripTrace
+
+
+def supports_tracing(converter: "BaseConverter") -> bool:
+    from owl.converters import ScanConverter, SineConverter
+
+    return isinstance(converter, SineConverter | ScanConverter)
+
+
+def start_trace(converter: "BaseConverter") -> Trace:
+    """Attach a new trace to `converter`, it's filled as the converter processes frames."""
+    from owl.converters import ScanConverter, SineConverter
+
+    if isinstance(converter, SineConverter):
+        converter.trace = SineTrace(sample_rate=converter.sample_rate, transient_duration=converter.transient_duration)
+        return converter.trace
+    if isinstance(converter, ScanConverter):
+        converter.trace = StripTrace(
+            sample_rate=converter.sample_rate,
+            frequencies=list(converter.frequencies),
+            ms_per_frame=converter.ms_per_frame,
+            transient_duration=converter.transient_duration,
+            sound_cue=converter.sound_cue,
+        )
+        return converter.trace
+    raise Exception(f"{type(converter).__name__} doesn't support tracing")
+
+
+def load_trace(path: str | Path) -> Trace:
+    with np.load(path) as data:
+        if data["kind"] == "sines":
+            return SineTrace(
+                sample_rate=int(data["sample_rate"]),
+                transient_duration=float(data["transient_duration"]),
+                times=data["times"].tolist(),
+                frequencies=list(data["frequencies"].astype(np.float64)),
+                volumes=list(data["volumes"].astype(np.float64)),
+                duration=float(data["duration"]),
+            )
+        if data["kind"] == "strips":
+            return StripTrace(
+                sample_rate=int(data["sample_rate"]),
+                frequencies=data["frequencies"].tolist(),
+                ms_per_frame=int(data["ms_per_frame"]),
+                transient_duration=float(data["transient_duration"]),
+                sound_cue=data["sound_cue"] if len(data["sound_cue"]) else None,
+                times=data["times"].tolist(),
+                volumes=list(data["volumes"].astype(np.float64)),
+                duration=float(data["duration"]),
+            )
+    raise Exception(f"{path} is not a trace")
+
+
+@arcparser
+class ResynthArgs:
+    trace: str = positional(help="trace recorded with `owl --trace`")
+    output: str = option("-o", help="wav file to write")
+    sample_rate: int | None = option(help="sample rate to synthesize at (default: the recorded one)")
+    transient_duration: float | None = option(help="parameter transition duration (default: the recorded one)")
+    ms_per_frame: int | None = option(help="frame duration of strip traces (default: the recorded one)")
+    engine: str = dict_option(
+        {"vectorized": "vectorized", "sine-gen": "sine-gen"},
+        default="vectorized",
+        help="synthesis engine of sine traces, sine-gen replays the converter's own oscillators (default: vectorized)",
+    )
+
+
+def main() -> int:
+    from owl.output_stream import FileAudioOutputStream
+
+    init_logging(level=logging.INFO)
+    args = ResynthArgs.parse()
+
+    trace = load_trace(args.trace)
+    if isinstance(trace, SineTrace):
+        signal = trace.synthesize(args.sample_rate, args.transient_duration, cast(SineEngine, args.engine))
+    else:
+        signal = trace.synthesize(args.sample_rate, args.transient_duration, args.ms_per_frame)
+
+    output_stream = FileAudioOutputStream(filename=args.output, sample_rate=args.sample_rate or trace.sample_rate)
+    output_stream.open()
+    output_stream.write(signal)
+    output_stream.close()
+    logger.info(f"synthesized {len(trace.times)} frames into {len(signal) / output_stream.sample_rate:.1f}s of audio")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())